@@ -2,6 +2,9 @@
 Application configuration loaded from environment variables.
 """
 import os
+import socket
+from functools import cached_property
+
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -12,6 +15,7 @@ class Settings(BaseSettings):
     # --- API Keys ---
     gamma_api_key: str = Field(default="", description="Gamma API key for deck generation")
     openrouter_api_key: str = Field(default="", description="OpenRouter API key for AI models")
+    anthropic_api_key: str = Field(default="", description="Anthropic API key; when set, Claude calls bypass OpenRouter")
 
     # --- Gamma Config ---
     gamma_theme_id: str = Field(default="", description="Pre-created theme ID in Gamma")
@@ -19,21 +23,40 @@ class Settings(BaseSettings):
 
     # --- Database ---
     database_url: str = Field(default="", description="PostgreSQL connection URL")
+    db_pool_size: int = Field(default=20, description="Persistent connections kept in the pool")
+    db_max_overflow: int = Field(default=20, description="Extra connections allowed under burst load")
+    db_pool_recycle: int = Field(default=1800, description="Recycle connections older than this (seconds)")
+    db_pool_pre_ping: bool = Field(default=True, description="Test connections before handing them out")
 
     # --- Redis ---
     redis_url: str = Field(default="redis://localhost:6379/0")
+    redis_max_connections: int = Field(default=50, description="Connection pool size for the web process")
 
     # --- Model Configuration ---
     pitch_generation_model: str = Field(default="anthropic/claude-3.5-sonnet", description="Model for pitch generation")
     service_mapping_model: str = Field(default="anthropic/claude-3.5-haiku", description="Model for service mapping")
-    pitch_max_tokens: int = Field(default=4096, description="Max tokens for pitch generation")
+    pitch_max_tokens: int = Field(default=8192, description="Max tokens for pitch generation; 15 slides with notes as JSON can pass 4k")
     service_mapping_max_tokens: int = Field(default=512, description="Max tokens for service mapping")
+    service_match_skip_gap: float = Field(default=0.3, description="Skip the Claude mapping call when the 3rd keyword score beats the 4th by this fraction")
     research_model: str = Field(default="perplexity/sonar", description="Model for company research")
+    anthropic_pitch_model: str = Field(default="claude-3-5-sonnet-latest", description="Anthropic model ID for pitch generation")
+    anthropic_mapping_model: str = Field(default="claude-3-5-haiku-latest", description="Anthropic model ID for service mapping")
+    cache_hit_rate_floor: float = Field(default=0.8, description="Warn when a batch's prompt-cache hit rate falls below this")
+    long_cache_ttl_min_rows: int = Field(default=10, description="Batches larger than this cache the static prompt prefix for 1h instead of 5m")
 
     # --- App ---
     upload_dir: str = Field(default="./uploads")
     output_dir: str = Field(default="./output")
     max_rows_per_upload: int = Field(default=100)
+    pipeline_workers: int = Field(default=4, description="Threads reserved for in-process pipeline runs")
+    celery_batch_dispatch: bool = Field(default=False, description="Queue uploads on Celery workers as row chunks instead of running them in-process")
+    batch_task_rows: int = Field(default=10, description="Rows per process_prospect_batch task when dispatching to Celery")
+    max_concurrency: int = Field(default=8, description="Prospects in the research/Claude stages at once within one batch run")
+    max_gamma_concurrency: int = Field(default=8, description="Gamma generations in flight at once within one batch run")
+    http_max_connections: int = Field(default=200, description="Outbound HTTP connection cap per event loop")
+    http_max_keepalive_connections: int = Field(default=100, description="Idle outbound connections kept open per event loop")
+    http_keepalive_expiry: float = Field(default=30.0, description="Seconds an idle outbound connection is kept for reuse")
+    max_upload_bytes: int = Field(default=10 * 1024 * 1024, description="Largest accepted Excel upload")
 
     # --- Paths ---
     services_catalog_path: str = Field(default="./data/services_catalog.yaml")
@@ -41,7 +64,7 @@ class Settings(BaseSettings):
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
-    @property
+    @cached_property
     def async_database_url(self) -> str:
         """Convert Railway's DATABASE_URL to asyncpg format for SQLAlchemy."""
         url = self.database_url
@@ -60,3 +83,17 @@ def ensure_dirs():
     """Create upload and output directories if they don't exist."""
     os.makedirs(settings.upload_dir, exist_ok=True)
     os.makedirs(settings.output_dir, exist_ok=True)
+
+
+def redis_connection_kwargs() -> dict:
+    """Keepalive and health-check options shared by every Redis connection pool."""
+    keepalive_options = {
+        opt: value
+        for name, value in (("TCP_KEEPIDLE", 60), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3))
+        if (opt := getattr(socket, name, None)) is not None  # not every platform has all three
+    }
+    return {
+        "socket_keepalive": True,
+        "socket_keepalive_options": keepalive_options,
+        "health_check_interval": 30,
+    }
@@ -1,10 +1,13 @@
 """
 Async SQLAlchemy engine, session factory, and table-creation helper.
 """
+import msgspec
+from sqlalchemy import insert, text
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 
 from app.config import settings
+from app.models import ProspectRow
 
 
 class Base(DeclarativeBase):
@@ -29,10 +32,58 @@ async def init_db():
     engine = create_async_engine(
         settings.async_database_url,
         echo=False,
-        pool_size=5,
-        max_overflow=10,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.db_pool_recycle,
+        connect_args={"server_settings": {"tcp_keepalives_idle": "60"}},
     )
     async_session = async_sessionmaker(engine, expire_on_commit=False)
 
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        # One catalog query on warm starts instead of create_all's per-table probes.
+        # It also flags a research_cache created before company_name_hash, which
+        # create_all would never add to an existing table.
+        table_names = list(Base.metadata.tables)
+        result = await conn.execute(
+            text(
+                "SELECT "
+                "(SELECT count(*) FROM pg_tables "
+                " WHERE schemaname = current_schema() AND tablename = ANY(:names)), "
+                "EXISTS (SELECT 1 FROM pg_tables "
+                " WHERE schemaname = current_schema() AND tablename = 'research_cache') "
+                "AND NOT EXISTS (SELECT 1 FROM information_schema.columns "
+                " WHERE table_schema = current_schema() AND table_name = 'research_cache' "
+                " AND column_name = 'company_name_hash')"
+            ),
+            {"names": table_names},
+        )
+        existing, research_cache_outdated = result.one()
+        if research_cache_outdated:
+            raise RuntimeError(
+                "research_cache has no company_name_hash column; apply "
+                "migrations/001_research_cache_company_name_hash.sql before starting"
+            )
+        if existing < len(table_names):
+            await conn.run_sync(Base.metadata.create_all)
+
+
+async def close_db():
+    """Dispose of the engine and close its pooled connections."""
+    if engine is not None:
+        await engine.dispose()
+
+
+async def bulk_insert_prospects(job_id: str, prospects: list[ProspectRow]):
+    """Insert all prospect rows for a job in one executemany round trip."""
+    if async_session is None:
+        return
+
+    from app.db_models import Prospect
+
+    async with async_session() as session:
+        await session.execute(
+            insert(Prospect),
+            [msgspec.to_builtins(p) | {"job_id": job_id} for p in prospects],
+        )
+        await session.commit()
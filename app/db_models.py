@@ -3,7 +3,10 @@ SQLAlchemy ORM models for Postgres persistence.
 Separate from Pydantic models in models.py to avoid breaking existing code.
 """
 import datetime
-from sqlalchemy import String, Text, Integer, Boolean, DateTime, JSON, func
+import hashlib
+
+from sqlalchemy import String, Text, Integer, Boolean, DateTime, Index, LargeBinary, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -12,7 +15,7 @@ from app.database import Base
 class Job(Base):
     __tablename__ = "jobs"
 
-    id: Mapped[str] = mapped_column(String(16), primary_key=True)
+    id: Mapped[str] = mapped_column(String(24), primary_key=True)
     status: Mapped[str] = mapped_column(String(32), default="processing")
     total_rows: Mapped[int] = mapped_column(Integer, default=0)
     completed: Mapped[int] = mapped_column(Integer, default=0)
@@ -32,7 +35,7 @@ class Prospect(Base):
     __tablename__ = "prospects"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    job_id: Mapped[str] = mapped_column(String(16), index=True)
+    job_id: Mapped[str] = mapped_column(String(24), index=True)
     row_index: Mapped[int] = mapped_column(Integer)
     company_name: Mapped[str] = mapped_column(String(256))
     industry: Mapped[str] = mapped_column(String(256), default="")
@@ -51,29 +54,51 @@ class GeneratedDeck(Base):
     __tablename__ = "generated_decks"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    job_id: Mapped[str] = mapped_column(String(16), index=True)
-    company_name: Mapped[str] = mapped_column(String(256), index=True)
+    job_id: Mapped[str] = mapped_column(String(24), index=True)
+    company_name: Mapped[str] = mapped_column(String(256))
     contact_name: Mapped[str] = mapped_column(String(256), default="")
     deck_url: Mapped[str] = mapped_column(String(1024), default="")
     pptx_url: Mapped[str] = mapped_column(String(1024), default="")
     pdf_url: Mapped[str] = mapped_column(String(1024), default="")
     gamma_id: Mapped[str] = mapped_column(String(128), default="")
-    research_data: Mapped[dict | None] = mapped_column(JSON, nullable=True)
-    pitch_content: Mapped[dict | None] = mapped_column(JSON, nullable=True)
-    mapped_services: Mapped[list | None] = mapped_column(JSON, nullable=True)
+    research_data: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    pitch_content: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    mapped_services: Mapped[list | None] = mapped_column(JSONB, nullable=True)
     created_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
 
 
+# Serves the newest-first /history listing without sorting the whole table
+Index("ix_decks_created_desc", GeneratedDeck.created_at.desc())
+# Per-company history ordered by date; also covers plain company_name lookups
+Index("ix_decks_company_created", GeneratedDeck.company_name, GeneratedDeck.created_at)
+# Key/containment lookups into stored research (e.g. research_data @> '{...}')
+Index("ix_decks_research_gin", GeneratedDeck.research_data, postgresql_using="gin")
+
+
+def normalize_company_name(name: str) -> str:
+    """Lower-case and collapse whitespace so name variants share one cache entry."""
+    return " ".join(name.lower().split())
+
+
+def research_cache_key(normalized_name: str) -> bytes:
+    """
+    Fixed-width SHA-1 digest of a company name already passed through
+    normalize_company_name; it is not normalized again here.
+    """
+    return hashlib.sha1(normalized_name.encode()).digest()
+
+
 class ResearchCache(Base):
     __tablename__ = "research_cache"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    company_name_normalized: Mapped[str] = mapped_column(
-        String(256), unique=True, index=True
+    company_name_hash: Mapped[bytes] = mapped_column(
+        LargeBinary(20), unique=True, index=True
     )
-    research_data: Mapped[dict] = mapped_column(JSON)
+    company_name_normalized: Mapped[str] = mapped_column(String(256))  # for debugging
+    research_data: Mapped[dict] = mapped_column(JSONB)
     created_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
@@ -1,25 +1,64 @@
 """
 FastAPI application entry point.
 """
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 import os
 
-from app.config import ensure_dirs
-from app.database import init_db
+from redis.asyncio import ConnectionPool, Redis
+from redis.exceptions import RedisError
+
+from app.config import settings, ensure_dirs, redis_connection_kwargs
+from app import database
+from app.services import http_client
 from app.routes.upload import router as upload_router
 from app.routes.status import router as status_router
 from app.routes.single import router as single_router
 from app.routes.themes import router as themes_router
 from app.routes.history import router as history_router
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build shared Redis and database pools once at startup and release them (and the HTTP client) on shutdown."""
+    ensure_dirs()
+    app.state.redis = Redis.from_pool(ConnectionPool.from_url(
+        settings.redis_url,
+        decode_responses=True,
+        max_connections=settings.redis_max_connections,
+        **redis_connection_kwargs(),
+    ))
+    try:
+        await app.state.redis.ping()  # Open the first pooled connection before traffic arrives
+    except RedisError as e:
+        print(f"Redis not reachable at startup: {e}")
+    await database.init_db()
+    app.state.async_session = database.async_session
+    # Long-running deck pipelines get their own threads instead of the default executor
+    app.state.pipeline_pool = ThreadPoolExecutor(
+        max_workers=settings.pipeline_workers,
+        thread_name_prefix="pipeline",
+    )
+    yield
+    app.state.pipeline_pool.shutdown(wait=False)
+    await app.state.redis.aclose()
+    await http_client.aclose()
+    await database.close_db()
+
+
 # Create app
 app = FastAPI(
     title="LakeB2B Pitch Deck Creator",
     description="Batch pitch deck generation from Excel prospect lists",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS (allow all for local dev)
@@ -43,13 +82,6 @@ app.include_router(themes_router)
 app.include_router(history_router)
 
 
-@app.on_event("startup")
-async def startup():
-    """Create required directories and initialize database on startup."""
-    ensure_dirs()
-    await init_db()
-
-
 @app.get("/")
 async def root(request: Request):
     """Serve the upload UI."""
@@ -5,6 +5,8 @@ from __future__ import annotations
 
 from enum import Enum
 from typing import Optional
+
+import msgspec
 from pydantic import BaseModel, Field
 
 
@@ -44,15 +46,15 @@ class SingleJobStatus(BaseModel):
 
 # ── Excel Row Input ──────────────────────────────────────────────────────────
 
-class ProspectRow(BaseModel):
-    """One row from the uploaded Excel file."""
-    row_index: int = Field(description="Original row number in the Excel (1-indexed)")
+class ProspectRow(msgspec.Struct, frozen=True):
+    """One row from the uploaded Excel file. Internal DTO, built once per row."""
+    row_index: int  # Original row number in the Excel (1-indexed)
     company_name: str
     industry: str = ""
     website_url: str = ""
     contact_name: str = ""
     contact_title: str = ""
-    extra_context: str = Field(default="", description="Any other notes/columns concatenated")
+    extra_context: str = ""  # Any other notes/columns concatenated
 
 
 # ── Research Output ──────────────────────────────────────────────────────────
@@ -119,8 +121,8 @@ class GammaResult(BaseModel):
     status: str = "pending"
 
 
-class RowResult(BaseModel):
-    """Final result for one Excel row."""
+class RowResult(msgspec.Struct, frozen=True):
+    """Final result for one Excel row. Internal DTO, built once per row."""
     row_index: int
     company_name: str
     status: RowStatus = RowStatus.QUEUED
@@ -129,12 +131,12 @@ class RowResult(BaseModel):
     error: str = ""
 
 
-class JobStatus(BaseModel):
+class JobStatus(msgspec.Struct):
     """Overall job status for the full Excel upload."""
     job_id: str
     total_rows: int = 0
     completed: int = 0
     failed: int = 0
     status: str = "pending"  # pending / processing / complete / failed
-    rows: list[RowResult] = Field(default_factory=list)
+    rows: list[RowResult] = msgspec.field(default_factory=list)
     output_file: str = ""
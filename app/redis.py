@@ -0,0 +1,10 @@
+"""
+Synchronous Redis client shared by the workers and the services they call.
+Workers only write through it (and read cached research as JSON bytes), so
+replies are left undecoded; the API's read path has its own async client.
+"""
+import redis
+
+from app.config import settings, redis_connection_kwargs
+
+redis_client = redis.from_url(settings.redis_url, **redis_connection_kwargs())
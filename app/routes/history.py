@@ -1,34 +1,51 @@
 """
 History route -- query Postgres for past generated decks.
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from sqlalchemy import select, desc, func
 
+from app.db_models import GeneratedDeck
+
 router = APIRouter()
 
 
 @router.get("/history")
-async def get_deck_history(limit: int = 50, offset: int = 0):
+async def get_deck_history(request: Request, limit: int = 50, offset: int = 0):
     """Return a paginated list of all generated decks."""
-    from app.database import async_session
-    from app.db_models import GeneratedDeck
+    async_session = request.app.state.async_session
 
     if async_session is None:
         raise HTTPException(status_code=503, detail="Database not configured")
 
     async with async_session() as session:
-        count_result = await session.execute(
-            select(func.count()).select_from(GeneratedDeck)
-        )
-        total = count_result.scalar()
-
+        # Page rows and the overall total in one round trip; the list view
+        # only needs scalar columns, so the JSON payloads are never fetched
         result = await session.execute(
-            select(GeneratedDeck)
+            select(
+                GeneratedDeck.id,
+                GeneratedDeck.job_id,
+                GeneratedDeck.company_name,
+                GeneratedDeck.contact_name,
+                GeneratedDeck.deck_url,
+                GeneratedDeck.pptx_url,
+                GeneratedDeck.gamma_id,
+                GeneratedDeck.created_at,
+                func.count().over().label("total"),
+            )
             .order_by(desc(GeneratedDeck.created_at))
             .offset(offset)
             .limit(limit)
         )
-        decks = result.scalars().all()
+        rows = result.all()
+
+        if rows:
+            total = rows[0].total
+        else:
+            # Past the last page the window count has no row to ride on
+            count_result = await session.execute(
+                select(func.count()).select_from(GeneratedDeck)
+            )
+            total = count_result.scalar()
 
     return {
         "total": total,
@@ -45,16 +62,15 @@ async def get_deck_history(limit: int = 50, offset: int = 0):
                 "gamma_id": d.gamma_id,
                 "created_at": d.created_at.isoformat() if d.created_at else None,
             }
-            for d in decks
+            for d in rows
         ],
     }
 
 
 @router.get("/history/{deck_id}")
-async def get_deck_detail(deck_id: int):
+async def get_deck_detail(deck_id: int, request: Request):
     """Return full details of a generated deck including research and content."""
-    from app.database import async_session
-    from app.db_models import GeneratedDeck
+    async_session = request.app.state.async_session
 
     if async_session is None:
         raise HTTPException(status_code=503, detail="Database not configured")
@@ -2,31 +2,36 @@
 Single client route – handles individual prospect processing.
 """
 import asyncio
-import uuid
+import secrets
 from functools import partial
 
-import redis
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 
-from app.config import settings
 from app.models import SingleProspect, RowStatus
 from app.workers.tasks import process_single_prospect
 
 router = APIRouter()
-redis_client = redis.from_url(settings.redis_url, decode_responses=True)
+
+# Enum values resolved once at import; the status endpoint is polled every second
+QUEUED_V = RowStatus.QUEUED.value
+RESEARCHING_V = RowStatus.RESEARCHING.value
+GENERATING_CONTENT_V = RowStatus.GENERATING_CONTENT.value
+CREATING_DECK_V = RowStatus.CREATING_DECK.value
+COMPLETE_V = RowStatus.COMPLETE.value
+FAILED_V = RowStatus.FAILED.value
 
 _STAGE_PROGRESS = {
-    RowStatus.QUEUED.value: 0,
-    RowStatus.RESEARCHING.value: 25,
-    RowStatus.GENERATING_CONTENT.value: 50,
-    RowStatus.CREATING_DECK.value: 75,
-    RowStatus.COMPLETE.value: 100,
-    RowStatus.FAILED.value: 100,
+    QUEUED_V: 0,
+    RESEARCHING_V: 25,
+    GENERATING_CONTENT_V: 50,
+    CREATING_DECK_V: 75,
+    COMPLETE_V: 100,
+    FAILED_V: 100,
 }
 
 
 @router.post("/single")
-async def create_single_prospect(data: SingleProspect):
+async def create_single_prospect(data: SingleProspect, request: Request):
     """
     Process a single client through the pitch deck pipeline.
     """
@@ -36,25 +41,26 @@ async def create_single_prospect(data: SingleProspect):
             detail="Client name, company, and role are required.",
         )
 
-    job_id = str(uuid.uuid4())[:8]
-
-    redis_client.hset(f"job:{job_id}", mapping={
-        "status": "processing",
-        "total_rows": "1",
-        "completed": "0",
-        "failed": "0",
-        "original_file": "",
-        "output_file": "",
-        "is_single": "true",
-    })
-
-    redis_client.hset(f"job:{job_id}:row:0", mapping={
-        "company_name": data.company,
-        "status": RowStatus.QUEUED.value,
-        "deck_url": "",
-        "pptx_url": "",
-        "error": "",
-    })
+    job_id = secrets.token_hex(6)
+
+    async with request.app.state.redis.pipeline(transaction=False) as pipe:
+        pipe.hset(f"job:{job_id}", mapping={
+            "status": "processing",
+            "total_rows": "1",
+            "completed": "0",
+            "failed": "0",
+            "original_file": "",
+            "output_file": "",
+            "is_single": "true",
+        })
+        pipe.hset(f"job:{job_id}:row:0", mapping={
+            "company_name": data.company,
+            "status": QUEUED_V,
+            "deck_url": "",
+            "pptx_url": "",
+            "error": "",
+        })
+        await pipe.execute()
 
     prospect_data = {
         "row_index": 0,
@@ -69,7 +75,7 @@ async def create_single_prospect(data: SingleProspect):
     # Run pipeline in background thread (no separate Celery worker needed)
     loop = asyncio.get_running_loop()
     loop.run_in_executor(
-        None,
+        request.app.state.pipeline_pool,
         partial(process_single_prospect.apply, args=[prospect_data, job_id]),
     )
 
@@ -82,20 +88,23 @@ async def create_single_prospect(data: SingleProspect):
 
 
 @router.get("/single/status/{job_id}")
-async def get_single_status(job_id: str):
+async def get_single_status(job_id: str, request: Request):
     """
     Get status for a single client processing job.
     """
     job_key = f"job:{job_id}"
     row_key = f"job:{job_id}:row:0"
 
-    job_data = redis_client.hgetall(job_key)
-    row_data = redis_client.hgetall(row_key)
+    async with request.app.state.redis.pipeline(transaction=False) as pipe:
+        pipe.hgetall(job_key)
+        pipe.hgetall(row_key)
+        job_data, row_data = await pipe.execute()
 
     if not job_data:
         raise HTTPException(status_code=404, detail="Job not found")
 
     status = job_data.get("status", "pending")
+    stage = row_data.get("status", QUEUED_V)
     completed = int(job_data.get("completed", 0))
     failed = int(job_data.get("failed", 0))
 
@@ -105,8 +114,8 @@ async def get_single_status(job_id: str):
         "status": status,
         "completed": completed,
         "failed": failed,
-        "progress_percent": _STAGE_PROGRESS.get(row_data.get("status", RowStatus.QUEUED.value), 0),
-        "current_stage": row_data.get("status", RowStatus.QUEUED.value),
+        "progress_percent": _STAGE_PROGRESS.get(stage, 0),
+        "current_stage": stage,
         "deck_url": row_data.get("deck_url", ""),
         "pptx_url": row_data.get("pptx_url", ""),
         "error": row_data.get("error", ""),
@@ -115,13 +124,10 @@ async def get_single_status(job_id: str):
 
 def _build_extra_context(data: SingleProspect) -> str:
     """Build extra context string from optional fields."""
-    parts = []
-    if data.linkedin_url:
-        parts.append(f"LinkedIn: {data.linkedin_url}")
-    if data.email:
-        parts.append(f"Email: {data.email}")
-    if data.phone:
-        parts.append(f"Phone: {data.phone}")
-    if data.notes:
-        parts.append(f"Notes: {data.notes}")
-    return " | ".join(parts)
+    fields = (
+        ("LinkedIn", data.linkedin_url),
+        ("Email", data.email),
+        ("Phone", data.phone),
+        ("Notes", data.notes),
+    )
+    return " | ".join(f"{label}: {value}" for label, value in fields if value)
@@ -3,21 +3,26 @@ Status route – check job progress and download results.
 """
 import os
 
-import redis
-from fastapi import APIRouter, HTTPException
+from cachetools import TTLCache
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import FileResponse
 
-from app.config import settings
-
 router = APIRouter()
-redis_client = redis.from_url(settings.redis_url, decode_responses=True)
+
+# Short-lived cache so clients polling within the same second share one reply
+_status_cache: TTLCache = TTLCache(maxsize=1024, ttl=1)
 
 
 @router.get("/status/{job_id}")
-async def get_job_status(job_id: str):
+async def get_job_status(job_id: str, request: Request):
     """Get the current status of a processing job."""
+    cached = _status_cache.get(job_id)
+    if cached is not None:
+        return cached
+
+    redis_client = request.app.state.redis
     job_key = f"job:{job_id}"
-    job_data = redis_client.hgetall(job_key)
+    job_data = await redis_client.hgetall(job_key)
 
     if not job_data:
         raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
@@ -26,11 +31,15 @@ async def get_job_status(job_id: str):
     completed = int(job_data.get("completed", 0))
     failed = int(job_data.get("failed", 0))
 
-    # Get per-row statuses
+    # Get per-row statuses in a single round trip
+    row_indices = range(2, total_rows + 2)  # Excel rows are 2-indexed (1 is header)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for row_idx in row_indices:
+            pipe.hgetall(f"job:{job_id}:row:{row_idx}")
+        row_results = await pipe.execute()
+
     rows = []
-    for row_idx in range(2, total_rows + 2):  # Excel rows are 2-indexed (1 is header)
-        row_key = f"job:{job_id}:row:{row_idx}"
-        row_data = redis_client.hgetall(row_key)
+    for row_idx, row_data in zip(row_indices, row_results):
         if row_data:
             rows.append({
                 "row_index": row_idx,
@@ -44,7 +53,7 @@ async def get_job_status(job_id: str):
     # Calculate overall progress
     progress_pct = round((completed + failed) / total_rows * 100) if total_rows > 0 else 0
 
-    return {
+    response = {
         "job_id": job_id,
         "status": job_data.get("status", "unknown"),
         "total_rows": total_rows,
@@ -54,13 +63,15 @@ async def get_job_status(job_id: str):
         "output_file": job_data.get("output_file", ""),
         "rows": rows,
     }
+    _status_cache[job_id] = response
+    return response
 
 
 @router.get("/download/{job_id}")
-async def download_output(job_id: str):
+async def download_output(job_id: str, request: Request):
     """Download the output Excel file with deck URLs."""
     job_key = f"job:{job_id}"
-    job_data = redis_client.hgetall(job_key)
+    job_data = await request.app.state.redis.hgetall(job_key)
 
     if not job_data:
         raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
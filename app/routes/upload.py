@@ -3,30 +3,33 @@ Upload route – handles Excel file upload and job creation.
 """
 import asyncio
 import os
-import uuid
+import secrets
+import traceback
 from functools import partial
 from pathlib import Path
 
-import redis
-from fastapi import APIRouter, UploadFile, File, HTTPException
+import aiofiles
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
 
 from app.config import settings
+from app.database import bulk_insert_prospects
 from app.models import RowStatus
 from app.services.excel_parser import parse_excel
-from app.workers.tasks import process_prospect, finalize_job
+from app.workers.tasks import dispatch_batches, finalize_job, run_batch
 
 router = APIRouter()
-redis_client = redis.from_url(settings.redis_url, decode_responses=True)
 
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
 
-def _run_batch_pipeline(row_tasks, job_id, saved_path):
-    """Execute row tasks sequentially in a background thread, then finalize."""
-    results = [sig.apply().result for sig in row_tasks]
+
+def _run_batch_pipeline(prospects, job_id, saved_path, long_ttl):
+    """Process all rows concurrently in a background thread, then finalize."""
+    results = run_batch(prospects, job_id, long_ttl)
     finalize_job.apply(args=[results, job_id, saved_path])
 
 
 @router.post("/upload")
-async def upload_excel(file: UploadFile = File(...)):
+async def upload_excel(request: Request, file: UploadFile = File(...)):
     """
     Upload an Excel file of prospects.
     Parses the file, creates a job, and queues each row for processing.
@@ -40,14 +43,26 @@ async def upload_excel(file: UploadFile = File(...)):
 
     # Save uploaded file
     os.makedirs(settings.upload_dir, exist_ok=True)
-    job_id = str(uuid.uuid4())[:8]
+    job_id = secrets.token_hex(6)
     file_ext = Path(file.filename).suffix
     saved_filename = f"{job_id}_{file.filename}"
     saved_path = os.path.join(settings.upload_dir, saved_filename)
 
-    with open(saved_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    # Stream to disk in chunks, rejecting oversized files as soon as the limit is hit
+    written = 0
+    async with aiofiles.open(saved_path, "wb") as f:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            written += len(chunk)
+            if written > settings.max_upload_bytes:
+                break
+            await f.write(chunk)
+
+    if written > settings.max_upload_bytes:
+        os.remove(saved_path)
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum is {settings.max_upload_bytes // (1024 * 1024)} MB.",
+        )
 
     # Parse Excel
     try:
@@ -67,39 +82,45 @@ async def upload_excel(file: UploadFile = File(...)):
         os.remove(saved_path)
         raise HTTPException(status_code=400, detail="No valid prospect rows found in the Excel file.")
 
-    # Initialize job status in Redis
-    job_key = f"job:{job_id}"
-    redis_client.hset(job_key, mapping={
-        "status": "processing",
-        "total_rows": str(len(prospects)),
-        "completed": "0",
-        "failed": "0",
-        "original_file": saved_path,
-        "output_file": "",
-    })
-
-    # Initialize per-row status
-    for prospect in prospects:
-        row_key = f"job:{job_id}:row:{prospect.row_index}"
-        redis_client.hset(row_key, mapping={
-            "company_name": prospect.company_name,
-            "status": RowStatus.QUEUED.value,
-            "deck_url": "",
-            "pptx_url": "",
-            "error": "",
+    # Initialize job and per-row status in Redis in a single round trip
+    async with request.app.state.redis.pipeline(transaction=False) as pipe:
+        pipe.hset(f"job:{job_id}", mapping={
+            "status": "processing",
+            "total_rows": str(len(prospects)),
+            "completed": "0",
+            "failed": "0",
+            "original_file": saved_path,
+            "output_file": "",
         })
+        for prospect in prospects:
+            pipe.hset(f"job:{job_id}:row:{prospect.row_index}", mapping={
+                "company_name": prospect.company_name,
+                "status": RowStatus.QUEUED.value,
+                "deck_url": "",
+                "pptx_url": "",
+                "error": "",
+            })
+        await pipe.execute()
+
+    # Record the prospects in Postgres; tracking must not block the job itself
+    try:
+        await bulk_insert_prospects(job_id, prospects)
+    except Exception:
+        traceback.print_exc()
 
-    # Run tasks in background thread (no separate Celery worker needed)
-    row_tasks = [
-        process_prospect.s(prospect.model_dump(), job_id)
-        for prospect in prospects
-    ]
-
+    long_ttl = len(prospects) > settings.long_cache_ttl_min_rows
     loop = asyncio.get_running_loop()
-    loop.run_in_executor(
-        None,
-        partial(_run_batch_pipeline, row_tasks, job_id, saved_path),
-    )
+    if settings.celery_batch_dispatch:
+        # Row chunks on the Celery workers; the broker round trip runs off the event loop
+        await loop.run_in_executor(
+            None, partial(dispatch_batches, prospects, job_id, saved_path, long_ttl)
+        )
+    else:
+        # Run the batch in a background thread (no separate Celery worker needed)
+        loop.run_in_executor(
+            request.app.state.pipeline_pool,
+            partial(_run_batch_pipeline, prospects, job_id, saved_path, long_ttl),
+        )
 
     return {
         "job_id": job_id,
@@ -1,8 +1,21 @@
 """
-Content generation using Claude 3.5 Sonnet via OpenRouter.
+Content generation using Claude 3.5 Sonnet, called directly through the
+Anthropic API when a key is configured (so the static prompt prefix is
+cached across a batch) and via OpenRouter otherwise.
 Two-phase: service mapping + pitch slide content generation.
 """
+import asyncio
+import json
+import re
+import weakref
+from collections.abc import AsyncIterator
+from contextvars import ContextVar
+from functools import lru_cache
+
+import anthropic
 import httpx
+import msgspec
+import orjson
 
 from app.config import settings
 from app.models import (
@@ -12,31 +25,333 @@ from app.models import (
     PitchContent,
     SlideContent,
 )
-from app.services.service_catalog import load_catalog, match_services
+from app.services import http_client
+from app.services.service_catalog import load_catalog, score_services
 
 OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+ANTHROPIC_MAX_RETRIES = 4
+ANTHROPIC_EXTENDED_TTL_BETA = "extended-cache-ttl-2025-04-11"
+
+# One SDK client per event loop, kept with the httpx client it was built on
+_anthropic_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple[httpx.AsyncClient, anthropic.AsyncAnthropic]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+# Prompts are split into a byte-stable prefix (system + instructions, no
+# per-prospect data) and a volatile tail. Prompt caching matches on exact
+# prefixes, so the prefix is written once per batch and read for every row.
+PITCH_SYSTEM_PROMPT = "You are an expert B2B pitch deck writer for LakeB2B, a leading B2B data services company."
+
+PITCH_INSTRUCTIONS = """Write a 15-slide pitch deck for the prospect below, using the research and the LakeB2B services provided.
+
+SCHEMA: 1=Title "[Company] × LakeB2B: [value prop]", 2=About [Company] (from research), 3=Pain Discovery (3 challenges as boxes), 4-6=Pain A→Impact→Service 1, 7-9=Pain B→Impact→Service 2, 10-12=Pain C→Impact→Service 3, 13=ROI Summary (quantified, all 3), 14=Why LakeB2B, 15=Next Steps & CTA (with timeline)
+
+RULES: pain points specific to the prospect, not generic industry problems; cite research data points and catalog ROI metrics; concise markdown bodies (bullets, bold); notes tell the presenter what to emphasize.
+
+FORMAT: reply with only a JSON array, one object per slide (n=number, t=title, b=markdown body, s=speaker notes), no other text:
+[{"n":1,"t":"...","b":"...","s":"..."}]"""
+
+SERVICE_MAPPING_SYSTEM_PROMPT = "You are a B2B sales strategist for LakeB2B."
+
+SERVICE_MAPPING_INSTRUCTIONS = (
+    "From the shortlisted services below, select exactly 3 that would be "
+    "MOST relevant and impactful for the prospect. Use the catalog above for "
+    "service details. Return ONLY the service IDs, one per line, "
+    "in order of relevance (most relevant first).\n"
+    "Format: Just the IDs, nothing else."
+)
+
+
+def _text_block(text: str) -> dict:
+    """A plain text content block."""
+    return {"type": "text", "text": text}
+
+
+def _cached_block(text: str, long_ttl: bool = False) -> dict:
+    """
+    A text content block marked as a prompt-cache breakpoint. The default
+    5-minute TTL can lapse during a long batch run; `long_ttl` keeps the
+    entry for an hour so it is written once per run.
+    """
+    cache_control = {"type": "ephemeral", "ttl": "1h"} if long_ttl else {"type": "ephemeral"}
+    return {"type": "text", "text": text, "cache_control": cache_control}
+
+
+def _openrouter_headers() -> dict:
+    """Standard headers for OpenRouter."""
+    return {
+        "Authorization": f"Bearer {settings.openrouter_api_key}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": "https://lakeb2b.com",
+        "X-Title": "LakeB2B Pitch Deck Creator",
+    }
+
+
+def _openrouter_messages(prompt: str | list[dict], system: str | None) -> list[dict]:
+    messages = [{"role": "user", "content": prompt}]
+    if system:
+        messages.insert(0, {"role": "system", "content": system})
+    return messages
+
+
+class CacheUsage(msgspec.Struct):
+    """Prompt-cache token totals accumulated across one batch run."""
+    calls: int = 0
+    cache_read: int = 0
+    cache_write: int = 0
+    uncached_input: int = 0
+    output: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of prompt tokens served from cache."""
+        prompt_tokens = self.cache_read + self.cache_write + self.uncached_input
+        return self.cache_read / prompt_tokens if prompt_tokens else 0.0
+
+
+# Set by the batch runner: the batch's running totals, and the row each
+# pipeline task is working on (tasks copy the context, so rows don't clash)
+batch_cache_usage: ContextVar[CacheUsage | None] = ContextVar("batch_cache_usage", default=None)
+current_row: ContextVar[int | None] = ContextVar("current_row", default=None)
+
+
+def _log_anthropic_usage(model: str, usage: anthropic.types.Usage) -> None:
+    cache_read = usage.cache_read_input_tokens or 0
+    cache_write = usage.cache_creation_input_tokens or 0
+    print(
+        f"Anthropic {model} row={current_row.get()}: cache_read={cache_read} "
+        f"cache_write={cache_write} input={usage.input_tokens} output={usage.output_tokens}"
+    )
+
+    totals = batch_cache_usage.get()
+    if totals is not None:
+        totals.calls += 1
+        totals.cache_read += cache_read
+        totals.cache_write += cache_write
+        totals.uncached_input += usage.input_tokens
+        totals.output += usage.output_tokens
 
 
-async def _call_openrouter(prompt: str, model: str = "anthropic/claude-3.5-sonnet", max_tokens: int = 8192) -> str:
-    """Make a call to OpenRouter API."""
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        response = await client.post(
-            OPENROUTER_API_URL,
-            headers={
-                "Authorization": f"Bearer {settings.openrouter_api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://lakeb2b.com",
-                "X-Title": "LakeB2B Pitch Deck Creator",
-            },
-            json={
-                "model": model,
-                "max_tokens": max_tokens,
-                "messages": [{"role": "user", "content": prompt}],
-            },
+def log_batch_cache_usage(job_id: str, totals: CacheUsage) -> None:
+    """
+    Summarize a batch's prompt caching. Past the first concurrent wave
+    (which writes the cache), a low hit rate means something volatile has
+    leaked into the cached prefix and every call is paying full price.
+    """
+    if not totals.calls:
+        return
+    print(
+        f"Batch {job_id} prompt cache: calls={totals.calls} hit_rate={totals.hit_rate:.2f} "
+        f"cache_read={totals.cache_read} cache_write={totals.cache_write} "
+        f"input={totals.uncached_input} output={totals.output}"
+    )
+    if totals.calls > settings.max_concurrency and totals.hit_rate < settings.cache_hit_rate_floor:
+        print(
+            f"Batch {job_id} prompt cache hit rate {totals.hit_rate:.2f} is below "
+            f"{settings.cache_hit_rate_floor:.2f}; check the cached prefix for per-prospect data"
         )
+
+
+async def _sse_events(response) -> AsyncIterator[dict]:
+    """Decode the JSON payloads of a server-sent event stream."""
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue  # event names, keepalive comments and blank separators
+        payload = line[5:].strip()
+        if payload == "[DONE]":
+            return
+        yield orjson.loads(payload)
+
+
+@http_client.retry_transient
+async def _call_openrouter(
+    prompt: str | list[dict],
+    model: str = "anthropic/claude-3.5-sonnet",
+    max_tokens: int = 8192,
+    system: str | None = None,
+) -> str:
+    """Make a call to OpenRouter API. `prompt` may be a string or a list of text blocks."""
+    response = await http_client.get_client().post(
+        OPENROUTER_API_URL,
+        headers=_openrouter_headers(),
+        json={
+            "model": model,
+            "max_tokens": max_tokens,
+            "messages": _openrouter_messages(prompt, system),
+        },
+        timeout=120.0,
+    )
+    response.raise_for_status()
+    data = orjson.loads(response.content)
+    return data["choices"][0]["message"]["content"]
+
+
+async def _stream_openrouter(
+    prompt: str | list[dict],
+    model: str,
+    max_tokens: int,
+    system: str | None = None,
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of `_call_openrouter`, yielding text as it arrives.
+    Raises if the completion stops at `max_tokens`, since the output is then incomplete.
+    """
+    async with http_client.get_client().stream(
+        "POST",
+        OPENROUTER_API_URL,
+        headers=_openrouter_headers(),
+        json={
+            "model": model,
+            "max_tokens": max_tokens,
+            "messages": _openrouter_messages(prompt, system),
+            "stream": True,
+        },
+        timeout=120.0,
+    ) as response:
         response.raise_for_status()
-        data = response.json()
-        return data["choices"][0]["message"]["content"]
+        async for event in _sse_events(response):
+            if "error" in event:
+                raise RuntimeError(f"OpenRouter stream error: {event['error']}")
+            choices = event.get("choices") or [{}]
+            text = choices[0].get("delta", {}).get("content")
+            if text:
+                yield text
+            if choices[0].get("finish_reason") == "length":
+                raise RuntimeError(f"OpenRouter output was cut off at max_tokens={max_tokens}")
+
+
+def _anthropic_client() -> anthropic.AsyncAnthropic:
+    """
+    The running loop's SDK client, built over its shared httpx client so
+    Anthropic calls reuse the same pooled connections. It is rebuilt if that
+    httpx client has been closed and replaced. The SDK retries 429/5xx and
+    connection errors itself with jittered backoff.
+    """
+    loop = asyncio.get_running_loop()
+    transport = http_client.get_client()
+    cached = _anthropic_clients.get(loop)
+    if cached is not None and cached[0] is transport:
+        return cached[1]
+    client = anthropic.AsyncAnthropic(
+        api_key=settings.anthropic_api_key,
+        http_client=transport,
+        max_retries=ANTHROPIC_MAX_RETRIES,
+        timeout=120.0,
+    )
+    _anthropic_clients[loop] = (transport, client)
+    return client
+
+
+def _anthropic_request(
+    system: str,
+    content: list[dict],
+    model: str,
+    max_tokens: int,
+    long_ttl: bool,
+) -> dict:
+    """Keyword arguments shared by the plain and streamed Messages calls."""
+    request = {
+        "model": model,
+        "max_tokens": max_tokens,
+        "system": system,
+        "messages": [{"role": "user", "content": content}],
+    }
+    if long_ttl:
+        request["extra_headers"] = {"anthropic-beta": ANTHROPIC_EXTENDED_TTL_BETA}
+    return request
+
+
+async def _call_anthropic(
+    system: str,
+    content: list[dict],
+    model: str,
+    max_tokens: int,
+    long_ttl: bool = False,
+) -> str:
+    """
+    Call the Anthropic Messages API directly. Cache breakpoints are carried
+    on the content blocks, so every call after the first in a batch reads
+    the static prefix from cache.
+    """
+    message = await _anthropic_client().messages.create(
+        **_anthropic_request(system, content, model, max_tokens, long_ttl)
+    )
+    _log_anthropic_usage(model, message.usage)
+    return "".join(block.text for block in message.content if block.type == "text")
+
+
+async def _stream_anthropic(
+    system: str,
+    content: list[dict],
+    model: str,
+    max_tokens: int,
+    long_ttl: bool = False,
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of `_call_anthropic`, yielding text deltas as they arrive.
+    Raises if the completion stops at `max_tokens`, since the output is then incomplete.
+    """
+    async with _anthropic_client().messages.stream(
+        **_anthropic_request(system, content, model, max_tokens, long_ttl)
+    ) as stream:
+        async for text in stream.text_stream:
+            yield text
+        message = await stream.get_final_message()
+    _log_anthropic_usage(model, message.usage)
+    if message.stop_reason == "max_tokens":
+        raise RuntimeError(f"Anthropic output was cut off at max_tokens={max_tokens}")
+
+
+async def _call_claude(
+    system: str,
+    content: list[dict],
+    openrouter_model: str,
+    anthropic_model: str,
+    max_tokens: int,
+    long_ttl: bool = False,
+) -> str:
+    """Route a Claude call direct to Anthropic when keyed, else through OpenRouter."""
+    if settings.anthropic_api_key:
+        return await _call_anthropic(system, content, anthropic_model, max_tokens, long_ttl)
+    return await _call_openrouter(content, model=openrouter_model, max_tokens=max_tokens, system=system)
+
+
+def _stream_claude(
+    system: str,
+    content: list[dict],
+    openrouter_model: str,
+    anthropic_model: str,
+    max_tokens: int,
+    long_ttl: bool = False,
+) -> AsyncIterator[str]:
+    """Streaming counterpart of `_call_claude`."""
+    if settings.anthropic_api_key:
+        return _stream_anthropic(system, content, anthropic_model, max_tokens, long_ttl)
+    return _stream_openrouter(content, model=openrouter_model, max_tokens=max_tokens, system=system)
+
+
+@http_client.retry_transient
+async def _stream_slides(
+    system: str,
+    content: list[dict],
+    openrouter_model: str,
+    anthropic_model: str,
+    max_tokens: int,
+    long_ttl: bool = False,
+) -> list[SlideContent]:
+    """
+    Stream a pitch completion and parse it into slides; a retry starts over.
+    A truncated or unparseable completion raises, so the row fails instead of
+    sending Gamma an empty deck.
+    """
+    chunks = [
+        text
+        async for text in _stream_claude(system, content, openrouter_model, anthropic_model, max_tokens, long_ttl)
+    ]
+    slides = _parse_slides("".join(chunks))
+    if not slides:
+        raise ValueError("No slides could be parsed from the pitch output")
+    return slides
 
 
 def _format_services_for_prompt(services: list[ServiceDefinition]) -> str:
@@ -45,6 +360,7 @@ def _format_services_for_prompt(services: list[ServiceDefinition]) -> str:
     for svc in services:
         parts.append(
             f"### {svc.name}\n"
+            f"**ID:** {svc.id}\n"
             f"**Tagline:** {svc.tagline}\n"
             f"**Description:** {svc.description}\n"
             f"**Pain Points Addressed:** {', '.join(svc.pain_points_addressed)}\n"
@@ -54,41 +370,65 @@ def _format_services_for_prompt(services: list[ServiceDefinition]) -> str:
     return "\n".join(parts)
 
 
+@lru_cache(maxsize=4)
+def _catalog_prompt_text(catalog_path: str) -> str:
+    """
+    The full service catalog formatted once per process. It is identical for
+    every prospect, so it is sent as the first cache breakpoint of each request.
+    """
+    catalog = load_catalog(catalog_path)
+    return f"## LAKEB2B SERVICE CATALOG\n{_format_services_for_prompt(catalog)}"
+
+
 async def map_services(
     prospect: ProspectRow,
     research: CompanyResearch,
+    long_ttl: bool = False,
 ) -> list[ServiceDefinition]:
     """
     Phase 1: Select the top 3 most relevant LakeB2B services for this prospect.
     Uses lightweight keyword matching first, then Claude for nuanced selection.
+    Pass `long_ttl` for large batches to keep the static prompt cached for an hour.
     """
     catalog = load_catalog(settings.services_catalog_path)
 
-    candidates = match_services(research, prospect.industry, catalog, top_n=5)
+    scored = score_services(research, prospect.industry, catalog, top_n=5)
+    candidates = [svc for svc, _ in scored]
 
     if len(candidates) <= 3:
         return candidates
 
-    candidates_text = _format_services_for_prompt(candidates)
+    # A clear gap between the 3rd and 4th keyword scores makes the top 3
+    # unambiguous; Claude would only confirm it
+    third, fourth = scored[2][1], scored[3][1]
+    if third > 0 and (third - fourth) / third >= settings.service_match_skip_gap:
+        print(
+            f"Skipping service mapping call for {prospect.company_name}: "
+            f"keyword scores {third:.1f} vs {fourth:.1f}"
+        )
+        return candidates[:3]
 
-    prompt = (
-        f"You are a B2B sales strategist for LakeB2B.\n\n"
+    prospect_block = (
         f"**Prospect:** {prospect.company_name} ({prospect.industry})\n"
         f"**Contact:** {prospect.contact_name}, {prospect.contact_title}\n\n"
         f"**Research Summary:**\n{research.overview[:2000]}\n\n"
         f"**Pain Points Found:**\n"
         + "\n".join(f"- {p}" for p in research.pain_points[:8])
-        + f"\n\n**Available LakeB2B Services:**\n{candidates_text}\n\n"
-        f"Select exactly 3 services that would be MOST relevant and impactful "
-        f"for this prospect. Return ONLY the service IDs, one per line, "
-        f"in order of relevance (most relevant first).\n"
-        f"Format: Just the IDs, nothing else."
+        + "\n\n**Shortlisted Service IDs:**\n"
+        + "\n".join(svc.id for svc in candidates)
     )
 
-    response_text = await _call_openrouter(
-        prompt,
-        model=settings.service_mapping_model,
+    response_text = await _call_claude(
+        SERVICE_MAPPING_SYSTEM_PROMPT,
+        [
+            _cached_block(_catalog_prompt_text(settings.services_catalog_path), long_ttl),
+            _cached_block(SERVICE_MAPPING_INSTRUCTIONS, long_ttl),
+            _text_block(prospect_block),
+        ],
+        openrouter_model=settings.service_mapping_model,
+        anthropic_model=settings.anthropic_mapping_model,
         max_tokens=settings.service_mapping_max_tokens,
+        long_ttl=long_ttl,
     )
 
     selected_ids = [
@@ -107,78 +447,48 @@ async def generate_pitch(
     prospect: ProspectRow,
     research: CompanyResearch,
     selected_services: list[ServiceDefinition] | None = None,
+    long_ttl: bool = False,
 ) -> PitchContent:
     """
     Phase 2: Generate complete pitch deck content for Gamma API.
     Returns structured content with slide-by-slide text.
     """
     if selected_services is None:
-        selected_services = await map_services(prospect, research)
+        selected_services = await map_services(prospect, research, long_ttl)
 
     services_text = _format_services_for_prompt(selected_services)
 
-    prompt = f"""You are an expert B2B pitch deck writer for LakeB2B, a leading B2B data services company.
-
-Create a persuasive, data-driven pitch deck for the following prospect.
-
-## PROSPECT INFO
+    extra_context = f"- **Extra Context:** {prospect.extra_context}\n" if prospect.extra_context else ""
+    prospect_block = f"""## PROSPECT INFO
 - **Company:** {prospect.company_name}
 - **Industry:** {prospect.industry}
 - **Website:** {prospect.website_url}
 - **Contact:** {prospect.contact_name}, {prospect.contact_title}
-{f"- **Extra Context:** {prospect.extra_context}" if prospect.extra_context else ""}
-
+{extra_context}
 ## RESEARCH ON PROSPECT
 {research.raw_research[:6000]}
 
-## LAKEB2B SERVICES TO PITCH (Top 3)
-{services_text}
-
-## INSTRUCTIONS
-Generate a 15-slide pitch deck with the following structure. For each slide, provide:
-- A compelling title
-- Body content (2-4 paragraphs or bullet points)
-- Speaker notes (what the presenter should say/emphasize)
-
-### SLIDE STRUCTURE:
-1. **Title Slide** - "{prospect.company_name} × LakeB2B: [Compelling value prop]"
-2. **About {prospect.company_name}** - Show understanding of their business (from research)
-3. **Pain Point Discovery** - Present 3 key challenges as visual boxes (from research)
-4-6. **Deep Dive: Pain Point A** - Problem → Impact → LakeB2B Solution (Service 1)
-7-9. **Deep Dive: Pain Point B** - Problem → Impact → LakeB2B Solution (Service 2)
-10-12. **Deep Dive: Pain Point C** - Problem → Impact → LakeB2B Solution (Service 3)
-13. **ROI Summary** - Quantified impact across all 3 solutions
-14. **Why LakeB2B** - Credibility, scale, differentiators
-15. **Next Steps & CTA** - Clear action items with timeline
-
-### FORMATTING RULES:
-- Use specific data points from research (don't be generic)
-- Include concrete ROI metrics from the service catalog
-- Pain points must be SPECIFIC to {prospect.company_name}, not generic industry problems
-- Speaker notes should guide the presenter on emphasis and talking points
-- Keep slide body concise - presentations are visual, not walls of text
-- Use markdown formatting (headers, bullet points, bold) for clarity
-
-### OUTPUT FORMAT:
-For each slide, output exactly:
----SLIDE [number]---
-TITLE: [slide title]
-BODY:
-[slide body content in markdown]
-NOTES:
-[speaker notes]
----END SLIDE---
-
-Generate all 15 slides now."""
-
-    raw_output = await _call_openrouter(
-        prompt,
-        model=settings.pitch_generation_model,
+Generate all 15 slides for {prospect.company_name} now."""
+
+    # Breakpoints: catalog, instructions, then the selected services, which
+    # repeat across prospects that map to the same top 3. Only the fully
+    # static blocks take the long TTL (longer TTLs must precede shorter ones).
+    # The output is streamed so a long generation keeps data flowing on the
+    # connection rather than waiting out the read timeout for one response.
+    slides = await _stream_slides(
+        PITCH_SYSTEM_PROMPT,
+        [
+            _cached_block(_catalog_prompt_text(settings.services_catalog_path), long_ttl),
+            _cached_block(PITCH_INSTRUCTIONS, long_ttl),
+            _cached_block(f"## LAKEB2B SERVICES TO PITCH (Top 3)\n{services_text}"),
+            _text_block(prospect_block),
+        ],
+        openrouter_model=settings.pitch_generation_model,
+        anthropic_model=settings.anthropic_pitch_model,
         max_tokens=settings.pitch_max_tokens,
+        long_ttl=long_ttl,
     )
 
-    slides = _parse_slides(raw_output)
-
     input_text = _build_gamma_input_text(slides, prospect)
 
     return PitchContent(
@@ -189,8 +499,94 @@ Generate all 15 slides now."""
     )
 
 
+# One complete slide block. Markers and labels only count at the start of a
+# line (after any indentation), so "BODY:" inside a title or note is text.
+# No field may run past a ---SLIDE marker, so a slide missing its end marker
+# cannot swallow the ones after it.
+_FIELD = r"((?:(?!---SLIDE).)*?)"
+_LINE = r"^[^\S\n]*"
+_SLIDE_RE = re.compile(
+    rf"{_LINE}---SLIDE\s*(\d+)---\s*{_LINE}TITLE:\s*{_FIELD}\s*{_LINE}BODY:\s*{_FIELD}"
+    rf"\s*{_LINE}NOTES:\s*{_FIELD}\s*{_LINE}---END SLIDE---",
+    re.DOTALL | re.MULTILINE,
+)
+_FENCE_RE = re.compile(r"^\s*```(?:json)?|```\s*$")
+_json_decoder = json.JSONDecoder()
+
+
+def _slide_from_match(m: re.Match) -> SlideContent:
+    return SlideContent(
+        slide_number=int(m.group(1)),
+        title=m.group(2).strip(),
+        body=m.group(3).strip(),
+        speaker_notes=m.group(4).strip(),
+    )
+
+
+def _parse_delimited_slides(raw_output: str) -> list[SlideContent]:
+    """
+    Slides from the older ---SLIDE--- delimited format. Each complete slide is
+    matched with `_SLIDE_RE`; whatever the regex cannot account for (missing
+    markers, non-numeric slide headers) goes through the line-by-line parser.
+    """
+    slides = []
+    consumed = 0
+    for m in _SLIDE_RE.finditer(raw_output):
+        slides.extend(_parse_gap(raw_output[consumed:m.start()]))
+        slides.append(_slide_from_match(m))
+        consumed = m.end()
+    slides.extend(_parse_gap(raw_output[consumed:]))
+    return slides
+
+
+def _parse_gap(text: str) -> list[SlideContent]:
+    return _parse_slide_lines(text) if "---SLIDE" in text else []
+
+
 def _parse_slides(raw_output: str) -> list[SlideContent]:
-    """Parse Claude's slide output into structured SlideContent objects."""
+    """
+    Parse Claude's slide output into structured SlideContent objects.
+    The prompt asks for a JSON array; output in the older delimited
+    ---SLIDE--- format (or JSON that fails to parse) is parsed by its markers.
+    """
+    slides = _parse_slides_json(raw_output)
+    if slides is not None:
+        return slides
+    return _parse_delimited_slides(raw_output)
+
+
+def _parse_slides_json(raw_output: str) -> list[SlideContent] | None:
+    """Slides from a JSON array of {n, t, b, s} objects, or None if it isn't one."""
+    # Tolerate a ```json fence or a sentence around the array: decoding stops
+    # at the end of the first complete JSON value, so a "]" in trailing text
+    # (a citation, a closing note) cannot spoil it. A "[" in leading text
+    # that does not start valid JSON is skipped.
+    text = _FENCE_RE.sub("", raw_output)
+    start = text.find("[")
+    while start >= 0:
+        try:
+            items, _ = _json_decoder.raw_decode(text, start)
+            break
+        except json.JSONDecodeError:
+            start = text.find("[", start + 1)
+    else:
+        return None
+    try:
+        return [
+            SlideContent(
+                slide_number=int(item["n"]),
+                title=str(item.get("t", "")).strip(),
+                body=str(item.get("b", "")).strip(),
+                speaker_notes=str(item.get("s", "")).strip(),
+            )
+            for item in items
+        ]
+    except (TypeError, KeyError, ValueError, AttributeError):
+        return None
+
+
+def _parse_slide_lines(raw_output: str) -> list[SlideContent]:
+    """Line-by-line fallback for output the slide regex cannot match."""
     slides = []
     current_slide_num = 0
     current_title = ""
@@ -264,11 +660,9 @@ def _build_gamma_input_text(slides: list[SlideContent], prospect: ProspectRow) -
     Build the inputText parameter for Gamma API.
     Gamma expects markdown-like content where sections become slides.
     """
-    parts = []
-    for slide in slides:
-        part = f"# {slide.title}\n\n{slide.body}"
-        if slide.speaker_notes:
-            part += f"\n\n> **Speaker Notes:** {slide.speaker_notes}"
-        parts.append(part)
-
-    return "\n\n---\n\n".join(parts)
+    return "\n\n---\n\n".join([
+        f"# {slide.title}\n\n{slide.body}\n\n> **Speaker Notes:** {slide.speaker_notes}"
+        if slide.speaker_notes
+        else f"# {slide.title}\n\n{slide.body}"
+        for slide in slides
+    ])
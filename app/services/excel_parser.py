@@ -4,8 +4,8 @@ Reads prospect data from uploaded Excel, writes deck URLs back as output.
 """
 from __future__ import annotations
 import os
-import shutil
 from datetime import datetime
+from itertools import chain
 from pathlib import Path
 
 from openpyxl import load_workbook, Workbook
@@ -23,13 +23,22 @@ COLUMN_ALIASES = {
 }
 
 
-def _find_column_index(headers: list[str], field: str) -> int | None:
-    """Find column index by matching against known aliases (case-insensitive)."""
-    aliases = COLUMN_ALIASES.get(field, [field])
-    for idx, header in enumerate(headers):
-        if header and header.strip().lower() in aliases:
-            return idx
-    return None
+# Reverse lookup: lowercase header alias → field name
+_ALIAS_TO_FIELD = {
+    alias: field
+    for field, aliases in COLUMN_ALIASES.items()
+    for alias in aliases
+}
+
+# ProspectRow fields filled straight from a mapped column, when one exists
+_OPTIONAL_FIELDS = ("industry", "website_url", "contact_name", "contact_title")
+
+
+def _cell(row: tuple, idx: int | None) -> str:
+    """Stripped text of the cell at `idx`, or "" when unmapped, missing or empty."""
+    if idx is not None and idx < len(row) and row[idx]:
+        return str(row[idx]).strip()
+    return ""
 
 
 def parse_excel(file_path: str) -> list[ProspectRow]:
@@ -40,21 +49,35 @@ def parse_excel(file_path: str) -> list[ProspectRow]:
     Other columns are matched flexibly via aliases.
     """
     wb = load_workbook(file_path, read_only=True, data_only=True)
-    ws = wb.active
+    try:
+        return _parse_rows(wb.active.iter_rows(values_only=True))
+    finally:
+        wb.close()
+
 
-    rows = list(ws.iter_rows(values_only=True))
-    if len(rows) < 2:
+def _parse_rows(rows) -> list[ProspectRow]:
+    """
+    Build prospects from a row iterator, header row first. Rows are consumed
+    one at a time so openpyxl's read-only mode never holds the whole sheet.
+    """
+    header_row = next(rows, None)
+    first_row = next(rows, None)
+    if header_row is None or first_row is None:
         raise ValueError("Excel file must have a header row and at least one data row.")
 
     # Parse headers
-    headers = [str(cell).strip() if cell else "" for cell in rows[0]]
+    headers = [str(cell).strip() if cell else "" for cell in header_row]
 
-    # Map columns
+    # Map columns in one pass; the first header matching a field wins, and any
+    # other non-empty column is carried along as extra context
     col_map = {}
-    for field in COLUMN_ALIASES:
-        idx = _find_column_index(headers, field)
-        if idx is not None:
+    extra_indices = []
+    for idx, header in enumerate(headers):
+        field = _ALIAS_TO_FIELD.get(header.lower())
+        if field and field not in col_map:
             col_map[field] = idx
+        elif header:
+            extra_indices.append(idx)
 
     if "company_name" not in col_map:
         raise ValueError(
@@ -63,14 +86,13 @@ def parse_excel(file_path: str) -> list[ProspectRow]:
             f"Expected one of: {COLUMN_ALIASES['company_name']}"
         )
 
-    # Collect extra columns not mapped to known fields
-    mapped_indices = set(col_map.values())
-    extra_indices = [i for i in range(len(headers)) if i not in mapped_indices and headers[i]]
+    company_idx = col_map["company_name"]
+    field_indices = [(field, col_map.get(field)) for field in _OPTIONAL_FIELDS]
 
     prospects = []
-    for row_idx, row in enumerate(rows[1:], start=2):  # 1-indexed, skip header
-        company_name = row[col_map["company_name"]] if col_map.get("company_name") is not None else ""
-        if not company_name or str(company_name).strip() == "":
+    for row_idx, row in enumerate(chain((first_row,), rows), start=2):  # 1-indexed, skip header
+        company_name = _cell(row, company_idx)
+        if not company_name:
             continue  # Skip empty rows
 
         # Gather extra context from unmapped columns
@@ -81,16 +103,12 @@ def parse_excel(file_path: str) -> list[ProspectRow]:
 
         prospect = ProspectRow(
             row_index=row_idx,
-            company_name=str(company_name).strip(),
-            industry=str(row[col_map["industry"]]).strip() if col_map.get("industry") is not None and col_map["industry"] < len(row) and row[col_map["industry"]] else "",
-            website_url=str(row[col_map["website_url"]]).strip() if col_map.get("website_url") is not None and col_map["website_url"] < len(row) and row[col_map["website_url"]] else "",
-            contact_name=str(row[col_map["contact_name"]]).strip() if col_map.get("contact_name") is not None and col_map["contact_name"] < len(row) and row[col_map["contact_name"]] else "",
-            contact_title=str(row[col_map["contact_title"]]).strip() if col_map.get("contact_title") is not None and col_map["contact_title"] < len(row) and row[col_map["contact_title"]] else "",
+            company_name=company_name,
             extra_context="; ".join(extra_parts),
+            **{field: _cell(row, idx) for field, idx in field_indices},
         )
         prospects.append(prospect)
 
-    wb.close()
     return prospects
 
 
@@ -98,6 +116,10 @@ def write_results(original_file_path: str, results: list[RowResult], output_dir:
     """
     Copy the original Excel and add result columns (Gamma Deck URL, Status).
     Returns the path to the output file.
+
+    The source is streamed in read-only mode into a write-only workbook, so
+    neither side holds the whole sheet in memory. Only the active sheet's
+    values and formulas are carried over, not its formatting.
     """
     os.makedirs(output_dir, exist_ok=True)
 
@@ -107,35 +129,30 @@ def write_results(original_file_path: str, results: list[RowResult], output_dir:
     output_filename = f"{original_name}_with_decks_{timestamp}.xlsx"
     output_path = os.path.join(output_dir, output_filename)
 
-    # Copy original file
-    shutil.copy2(original_file_path, output_path)
-
-    # Open and add columns
-    wb = load_workbook(output_path)
-    ws = wb.active
-
-    # Find the next empty column for our results
-    max_col = ws.max_column
-    url_col = max_col + 1
-    status_col = max_col + 2
-    pptx_col = max_col + 3
-
-    # Write headers
-    ws.cell(row=1, column=url_col, value="Gamma Deck URL")
-    ws.cell(row=1, column=status_col, value="Generation Status")
-    ws.cell(row=1, column=pptx_col, value="PPTX Download URL")
-
     # Build a map of row_index → result
     result_map = {r.row_index: r for r in results}
 
-    for row_idx in range(2, ws.max_row + 1):
-        result = result_map.get(row_idx)
-        if result:
-            ws.cell(row=row_idx, column=url_col, value=result.deck_url)
-            ws.cell(row=row_idx, column=status_col, value=result.status.value)
-            ws.cell(row=row_idx, column=pptx_col, value=result.pptx_url)
-
-    wb.save(output_path)
-    wb.close()
+    src = load_workbook(original_file_path, read_only=True)
+    dst = Workbook(write_only=True)
+    try:
+        ws = src.active
+        if ws.max_column is None:
+            ws.calculate_dimension(force=True)  # Sheet saved without a dimension record
+        width = ws.max_column or 0
+        ws_out = dst.create_sheet(title=ws.title)
+
+        # Result columns go after the last used column; rows are padded to it
+        rows = ws.iter_rows(min_row=1, max_col=width, values_only=True)
+        for row_idx, row in enumerate(rows, start=1):
+            row = list(row) + [None] * (width - len(row))
+            if row_idx == 1:
+                row += ["Gamma Deck URL", "Generation Status", "PPTX Download URL"]
+            elif result := result_map.get(row_idx):
+                row += [result.deck_url, result.status.value, result.pptx_url]
+            ws_out.append(row)
+
+        dst.save(output_path)
+    finally:
+        src.close()
 
     return output_path
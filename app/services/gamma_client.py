@@ -6,11 +6,13 @@ and returns deck URLs.
 API docs: https://developers.gamma.app/reference/generate-a-gamma
 """
 import asyncio
+import time
+
 import httpx
-from tenacity import retry, stop_after_attempt, wait_exponential
 
 from app.config import settings
 from app.models import PitchContent, GammaResult
+from app.services import http_client
 
 
 def _headers() -> dict:
@@ -21,7 +23,6 @@ def _headers() -> dict:
     }
 
 
-@retry(stop=stop_after_attempt(2), wait=wait_exponential(min=3, max=15))
 async def create_presentation(content: PitchContent) -> GammaResult:
     """
     Generate a presentation via Gamma API v1.0.
@@ -31,52 +32,83 @@ async def create_presentation(content: PitchContent) -> GammaResult:
     2. Poll GET /generations/{id} until completed
     3. Return deck URL
     """
-    async with httpx.AsyncClient(timeout=300.0) as client:
-        # Step 1: Submit generation request
-        payload = {
-            "inputText": content.input_text,
-            "textMode": "preserve",
-            "format": "presentation",
-            "numCards": len(content.slides) or 15,
-            "exportAs": "pptx",
-        }
-
-        if settings.gamma_theme_id:
-            payload["themeId"] = settings.gamma_theme_id
-
-        response = await client.post(
-            f"{settings.gamma_api_base_url}/generations",
-            headers=_headers(),
-            json=payload,
-        )
-        response.raise_for_status()
-        gen_data = response.json()
-
-        generation_id = gen_data.get("generationId", "")
-        if not generation_id:
-            raise RuntimeError(f"Gamma API did not return a generationId: {gen_data}")
-
-        # Step 2: Poll for completion
-        return await _poll_generation(client, generation_id)
+    client = http_client.get_client()
+
+    # Step 1: Submit generation request
+    payload = {
+        "inputText": content.input_text,
+        "textMode": "preserve",
+        "format": "presentation",
+        "numCards": len(content.slides) or 15,
+        "exportAs": "pptx",
+    }
+
+    if settings.gamma_theme_id:
+        payload["themeId"] = settings.gamma_theme_id
+
+    generation_id = await _submit_generation(client, payload)
+
+    # Step 2: Poll for completion
+    return await _poll_generation(client, generation_id)
+
+
+@http_client.retry_transient
+async def _submit_generation(client: httpx.AsyncClient, payload: dict) -> str:
+    """
+    POST the generation request and return its ID. Only this call is retried
+    as a whole; a failed poll is retried inside _poll_generation, so a network
+    blip while waiting never submits (and pays for) a second generation.
+    """
+    response = await client.post(
+        f"{settings.gamma_api_base_url}/generations",
+        headers=_headers(),
+        json=payload,
+        timeout=300.0,
+    )
+    response.raise_for_status()
+    gen_data = response.json()
+
+    generation_id = gen_data.get("generationId", "")
+    if not generation_id:
+        raise RuntimeError(f"Gamma API did not return a generationId: {gen_data}")
+    return generation_id
 
 
 async def _poll_generation(
     client: httpx.AsyncClient,
     generation_id: str,
     max_wait_seconds: int = 300,
-    poll_interval: int = 5,
+    initial_delay: float = 1.0,
+    max_delay: float = 15.0,
 ) -> GammaResult:
-    """Poll Gamma API until generation is complete or timeout."""
-    elapsed = 0
-
-    while elapsed < max_wait_seconds:
-        await asyncio.sleep(poll_interval)
-        elapsed += poll_interval
-
-        response = await client.get(
-            f"{settings.gamma_api_base_url}/generations/{generation_id}",
-            headers=_headers(),
-        )
+    """
+    Poll Gamma API until generation is complete or timeout.
+    The first check comes after a second to catch fast generations, then the
+    interval grows 1.5x per poll up to `max_delay`; a Retry-After header from
+    Gamma overrides the next interval, clamped to [initial_delay, max_delay].
+    Connection errors and non-200 replies are retried on the same schedule
+    until `max_wait_seconds` of wall-clock time runs out.
+    """
+    deadline = time.monotonic() + max_wait_seconds
+    delay = initial_delay
+
+    while (remaining := deadline - time.monotonic()) > 0:
+        await asyncio.sleep(min(delay, remaining))
+
+        try:
+            response = await client.get(
+                f"{settings.gamma_api_base_url}/generations/{generation_id}",
+                headers=_headers(),
+            )
+        except httpx.TransportError as e:
+            print(f"Gamma poll for {generation_id} failed, retrying: {e!r}")
+            delay = min(delay * 1.5, max_delay)
+            continue
+        retry_after = http_client.retry_after_seconds(response)
+        if retry_after is not None:
+            delay = min(max(retry_after, initial_delay), max_delay)
+        else:
+            delay = min(delay * 1.5, max_delay)
 
         if response.status_code == 200:
             data = response.json()
@@ -118,10 +150,10 @@ def _parse_gamma_response(data: dict) -> GammaResult:
 
 async def list_themes() -> list[dict]:
     """Fetch available themes from Gamma API."""
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(
-            f"{settings.gamma_api_base_url}/themes",
-            headers=_headers(),
-        )
-        response.raise_for_status()
-        return response.json()
+    response = await http_client.get_client().get(
+        f"{settings.gamma_api_base_url}/themes",
+        headers=_headers(),
+        timeout=30.0,
+    )
+    response.raise_for_status()
+    return response.json()
@@ -0,0 +1,174 @@
+"""
+Shared httpx client for outbound API calls (OpenRouter, Anthropic, Gamma).
+
+Keeps one AsyncClient per event loop so TLS handshakes and pooled
+connections are reused across calls. Celery tasks and the batch runner
+each drive their own loop, and connections cannot cross loops.
+"""
+import asyncio
+import re
+import time
+import weakref
+
+import httpx
+from tenacity import (
+    RetryCallState,
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from app.config import settings
+
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the running loop's client, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        # Accept-Encoding is left to httpx: it advertises gzip/deflate, plus br
+        # when brotli is installed, and only what it can actually decode
+        client = httpx.AsyncClient(
+            http2=True,  # Concurrent research, pitch and Gamma calls multiplex per host
+            timeout=httpx.Timeout(300.0, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive_connections,
+                # httpx drops idle connections after 5s by default, shorter than
+                # a Gamma poll interval or the gap between a row's research and pitch
+                keepalive_expiry=settings.http_keepalive_expiry,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+def retry_after_seconds(response: httpx.Response) -> float | None:
+    """Seconds requested by a Retry-After header, if present and numeric."""
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None  # HTTP-date form; fall back to our own backoff
+
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _reset_seconds(value: str) -> float | None:
+    """
+    Seconds until a rate-limit window resets. Accepts an epoch timestamp in
+    ms or s (OpenRouter), a plain number of seconds, or a duration like "6m0s".
+    """
+    try:
+        number = float(value)
+    except ValueError:
+        parts = _DURATION_RE.findall(value)
+        if not parts:
+            return None
+        return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts)
+    if number > 1e12:
+        return number / 1000 - time.time()
+    if number > 1e9:
+        return number - time.time()
+    return number
+
+
+class RateLimitBudget:
+    """
+    Client-side admission control from an API's rate-limit headers.
+    While the last reported request budget is comfortable, calls go straight
+    through; once it drops to `headroom` or below, calls are spread evenly
+    over what is left of the window, and a 429's Retry-After pauses everyone.
+    """
+
+    def __init__(self, headroom: int):
+        self.headroom = headroom
+        self.remaining: int | None = None
+        self.reset_at = 0.0  # time.monotonic() at which the window resets
+        self.next_slot = 0.0
+
+    def update(self, response: httpx.Response) -> None:
+        """Record the budget reported by a response, if it carries one."""
+        headers = response.headers
+        remaining = headers.get("x-ratelimit-remaining-requests", headers.get("x-ratelimit-remaining"))
+        reset = headers.get("x-ratelimit-reset-requests", headers.get("x-ratelimit-reset"))
+        if remaining is None or reset is None:
+            return
+        reset_in = _reset_seconds(reset)
+        try:
+            self.remaining = int(float(remaining))
+        except ValueError:
+            return
+        if reset_in is not None:
+            self.reset_at = time.monotonic() + max(reset_in, 0.0)
+
+    def pause(self, seconds: float) -> None:
+        """Hold all calls for `seconds`, e.g. after a 429 with Retry-After."""
+        self.remaining = 0
+        self.reset_at = max(self.reset_at, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        """Wait for this call's slot in the current window."""
+        now = time.monotonic()
+        if self.remaining is None or now >= self.reset_at:
+            return
+        if self.remaining <= 0:
+            await asyncio.sleep(self.reset_at - now)
+            return
+        if self.remaining > self.headroom:
+            self.remaining -= 1
+            return
+        slot = max(now, self.next_slot)
+        self.next_slot = slot + (self.reset_at - now) / self.remaining
+        self.remaining -= 1
+        await asyncio.sleep(slot - now)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Rate limits, upstream 5xx and connection-level failures are worth retrying."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, httpx.TransportError)
+
+
+_backoff = wait_random_exponential(multiplier=1, max=30)
+
+
+def wait_retry_after(retry_state: RetryCallState) -> float:
+    """
+    Wait as long as the upstream's Retry-After asks (capped at 60s), otherwise
+    full-jitter exponential backoff, so rows that fail together under
+    concurrent batch runs do not retry in lock-step.
+    """
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, httpx.HTTPStatusError):
+        retry_after = retry_after_seconds(exc.response)
+        if retry_after is not None:
+            return min(retry_after, 60.0)
+    return _backoff(retry_state)
+
+
+retry_transient = retry(
+    stop=stop_after_attempt(5),
+    wait=wait_retry_after,
+    retry=retry_if_exception(is_retryable),
+    reraise=True,
+)
+
+
+async def aclose() -> None:
+    """Close the running loop's client, if one was opened."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
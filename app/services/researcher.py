@@ -1,19 +1,44 @@
 """
 Company research using Perplexity Sonar via OpenRouter API.
 Implements adaptive depth (quick vs deep) based on data availability.
-Caches research in Postgres to avoid repeat API calls (30-day TTL).
+Each company is researched with one structured JSON prompt, falling back to
+separate per-topic queries when the answer cannot be parsed.
+Caches research in Redis and Postgres to avoid repeat API calls (30-day TTL).
 """
+import asyncio
 import datetime
+import re
+from functools import lru_cache
+from itertools import islice
+
 import httpx
-from tenacity import retry, stop_after_attempt, wait_exponential
+import orjson
+from sqlalchemy.exc import IntegrityError
+from tenacity import retry, retry_if_exception, stop_after_attempt
 
 from app.config import settings
+from app.db_models import normalize_company_name
 from app.models import ProspectRow, CompanyResearch, ResearchDepth
+from app.redis import redis_client
+from app.services import http_client
 
 RESEARCH_CACHE_TTL_DAYS = 30
+RESEARCH_CACHE_TTL_SECONDS = RESEARCH_CACHE_TTL_DAYS * 24 * 60 * 60
 
 OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
 
+# A bulleted line longer than 5 characters once stripped; the item is the rest
+# of the line after the run of bullet characters and spaces. Every match starts
+# at a "\n", which the regex engine can scan for quickly; the caller searches
+# "\n" + text so the first line has one too. The (?![-•*– ]) keeps the bullet
+# run from backtracking into the item, so a line of only bullets yields nothing.
+_BULLET_RE = re.compile(r"\n[^\S\n]*(?=[-•*–][^\n]{4,}\S)[-•*– ]+(?![-•*– ])[^\S\n]*(\S(?:[^\n]*\S)?)")
+_SENTENCE_RE = re.compile(r"[^.]+")
+
+# OpenRouter's request budget as last reported; Perplexity calls wait on it
+# once few requests are left in the window, rather than running into 429s
+_ratelimit_state = http_client.RateLimitBudget(headroom=settings.max_concurrency)
+
 WELL_KNOWN_COMPANIES = {
     "salesforce", "snowflake", "hubspot", "adobe", "oracle", "sap", "microsoft",
     "google", "amazon", "meta", "apple", "ibm", "cisco", "dell", "intel",
@@ -23,8 +48,9 @@ WELL_KNOWN_COMPANIES = {
 }
 
 
+@lru_cache(maxsize=1)
 def _load_system_prompt() -> str:
-    """Load the research system prompt from file."""
+    """Load the research system prompt from file. Read once per process."""
     try:
         with open(settings.research_system_prompt_path, "r") as f:
             return f.read().strip()
@@ -37,9 +63,14 @@ def _load_system_prompt() -> str:
         )
 
 
-def determine_research_depth(prospect: ProspectRow) -> ResearchDepth:
-    """Decide whether to run quick or deep research based on data availability."""
-    if prospect.company_name.lower().strip() in WELL_KNOWN_COMPANIES:
+def determine_research_depth(prospect: ProspectRow, normalized_name: str | None = None) -> ResearchDepth:
+    """
+    Decide whether to run quick or deep research based on data availability.
+    Pass `normalized_name` when the caller has already normalized the company name.
+    """
+    if normalized_name is None:
+        normalized_name = normalize_company_name(prospect.company_name)
+    if normalized_name in WELL_KNOWN_COMPANIES:
         return ResearchDepth.QUICK
 
     if prospect.industry and prospect.website_url:
@@ -48,52 +79,207 @@ def determine_research_depth(prospect: ProspectRow) -> ResearchDepth:
     return ResearchDepth.DEEP
 
 
-@retry(stop=stop_after_attempt(2), wait=wait_exponential(min=2, max=10))
-async def _query_perplexity(query: str, model: str = "perplexity/sonar") -> str:
+# Shared Retry-After-aware jittered backoff; one attempt fewer than
+# retry_transient so a throttled row gives up its LLM slot sooner
+@retry(
+    stop=stop_after_attempt(4),
+    wait=http_client.wait_retry_after,
+    retry=retry_if_exception(http_client.is_retryable),
+    reraise=True,
+)
+async def _query_perplexity(query: str, model: str = "perplexity/sonar", json_mode: bool = False) -> str:
     """Make a single query to Perplexity via OpenRouter API."""
     system_prompt = _load_system_prompt()
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(
-            OPENROUTER_API_URL,
-            headers={
-                "Authorization": f"Bearer {settings.openrouter_api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://lakeb2b.com",
-                "X-Title": "LakeB2B Pitch Deck Creator",
-            },
-            json={
-                "model": model,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": query},
-                ],
-            },
-        )
-        response.raise_for_status()
-        data = response.json()
-        return data["choices"][0]["message"]["content"]
+    payload = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": query},
+        ],
+    }
+    if json_mode:
+        payload["response_format"] = {"type": "json_object"}
+
+    await _ratelimit_state.acquire()
+    response = await http_client.get_client().post(
+        OPENROUTER_API_URL,
+        headers={
+            "Authorization": f"Bearer {settings.openrouter_api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://lakeb2b.com",
+            "X-Title": "LakeB2B Pitch Deck Creator",
+        },
+        json=payload,
+        timeout=60.0,
+    )
+    _ratelimit_state.update(response)
+    if response.status_code == 429:
+        _ratelimit_state.pause(http_client.retry_after_seconds(response) or 1.0)
+    response.raise_for_status()
+    data = orjson.loads(response.content)
+    return data["choices"][0]["message"]["content"]
 
 
-async def research_company(prospect: ProspectRow) -> CompanyResearch:
+async def research_company(prospect: ProspectRow, normalized_name: str | None = None) -> CompanyResearch:
     """
     Research a company using Perplexity Sonar via OpenRouter.
-    Checks Postgres cache first (30-day TTL) to avoid repeat API costs.
+    Checks the Redis and Postgres caches first (30-day TTL) to avoid repeat API costs.
+    Pass `normalized_name` when the caller has already normalized the company name.
     """
+    # Normalize once; the depth check and both cache tiers key off it
+    if normalized_name is None:
+        normalized_name = normalize_company_name(prospect.company_name)
+
     # Check cache first
-    cached = await _check_research_cache(prospect.company_name)
+    cached = await _check_research_cache(normalized_name)
     if cached:
         return cached
 
-    depth = determine_research_depth(prospect)
-    model = settings.research_model
+    depth = determine_research_depth(prospect, normalized_name)
 
-    company = prospect.company_name
+    research = await _research_structured(prospect, depth)
+    complete = True
+    if research is None:
+        research, complete = await _research_multi_query(prospect, depth)
+
+    # Save to cache for future lookups; partial research is not worth 30 days
+    if complete:
+        await _save_research_cache(normalized_name, research)
+
+    return research
+
+
+def _prompt_hints(prospect: ProspectRow) -> tuple[str, str]:
+    """Website and industry phrases appended to the company name in prompts."""
     url_hint = f" (website: {prospect.website_url})" if prospect.website_url else ""
     industry_hint = f" in the {prospect.industry} industry" if prospect.industry else ""
+    return url_hint, industry_hint
 
-    queries = []
 
+def _structured_query(prospect: ProspectRow, depth: ResearchDepth) -> str:
+    """One prompt covering every research section, answered as a JSON object."""
+    company = prospect.company_name
+    url_hint, industry_hint = _prompt_hints(prospect)
+    deep = depth == ResearchDepth.DEEP
+
+    overview = (
+        "Founding year, headquarters, employee count, revenue range, key leadership, "
+        "mission and primary business model"
+        if deep else
+        "What they do, company size, target market and key products/services"
+    )
+    sections = [
+        f'"overview": string. {overview}.',
+        '"tech_stack": array of strings. Their CRM, marketing automation, '
+        'data/analytics and cloud tools.',
+        '"pain_points": array of strings. Data quality/enrichment needs, SDR productivity, '
+        'buyer intent visibility, lead scoring, ABM and demand generation challenges.',
+        '"opportunities": array of strings. Openings for B2B data, sales intelligence '
+        'or marketing technology services.',
+        '"industry_context": string. Their industry position and competitive pressures.',
+        '"recent_news": string. Latest news, funding, partnerships, product launches and '
+        'strategic priorities'
+        + (", plus the buyer personas who would purchase B2B data solutions." if deep else "."),
+    ]
+    if deep:
+        sections.append('"competitive_landscape": string. Main competitors and how they differ.')
+
+    return (
+        f"Research {company}{url_hint}{industry_hint}. "
+        f"Respond with only a JSON object with these keys:\n" + "\n".join(sections)
+    )
+
+
+async def _research_structured(prospect: ProspectRow, depth: ResearchDepth) -> CompanyResearch | None:
+    """
+    Research in a single Perplexity call. Returns None when the answer is not
+    usable JSON (or JSON mode is rejected), so the caller can fall back.
+    """
+    try:
+        answer = await _query_perplexity(
+            _structured_query(prospect, depth), model=settings.research_model, json_mode=True
+        )
+    except httpx.HTTPStatusError as exc:
+        if exc.response.status_code not in (400, 422):
+            raise
+        print(f"Structured research rejected for {prospect.company_name}: {exc}")
+        return None
+
+    sections = _parse_research_json(answer)
+    if sections is None:
+        print(f"Structured research for {prospect.company_name} was not valid JSON; using per-topic queries")
+        return None
+
+    return CompanyResearch(
+        company_name=prospect.company_name,
+        overview=_as_text(sections.get("overview")),
+        pain_points=_as_list(sections.get("pain_points")),
+        tech_stack=_as_list(sections.get("tech_stack")),
+        industry_context=_as_text(sections.get("industry_context")),
+        recent_news=_as_text(sections.get("recent_news")),
+        opportunities=_as_list(sections.get("opportunities")),
+        competitive_landscape=_as_text(sections.get("competitive_landscape")),
+        depth_used=depth,
+        raw_research=_format_sections(sections),
+    )
+
+
+def _parse_research_json(answer: str) -> dict | None:
+    """The JSON object in a research answer, or None if there isn't a usable one."""
+    # Tolerate a ```json fence or a sentence around the object
+    start, end = answer.find("{"), answer.rfind("}")
+    if start < 0 or end < start:
+        return None
+    try:
+        sections = orjson.loads(answer[start:end + 1])
+    except orjson.JSONDecodeError:
+        return None
+    if not isinstance(sections, dict) or not _as_text(sections.get("overview")):
+        return None
+    return sections
+
+
+def _as_text(value) -> str:
+    """A section value as text; list answers are joined one item per line."""
+    if isinstance(value, list):
+        return "\n".join(str(v).strip() for v in value if v)
+    return str(value).strip() if value else ""
+
+
+def _as_list(value) -> list[str]:
+    """A section value as a list of items; prose answers are split into points."""
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if v and str(v).strip()]
+    return _extract_bullet_points(value) if isinstance(value, str) and value else []
+
+
+def _format_sections(sections: dict) -> str:
+    """Readable research text for the pitch prompt, one headed block per section."""
+    blocks = []
+    for key, value in sections.items():
+        if isinstance(value, list):
+            text = "\n".join(f"- {item}" for item in _as_list(value))
+        else:
+            text = _as_text(value)
+        if text:
+            blocks.append(f"{key.replace('_', ' ').title()}:\n{text}")
+    return "\n\n---\n\n".join(blocks)
+
+
+async def _research_multi_query(
+    prospect: ProspectRow, depth: ResearchDepth
+) -> tuple[CompanyResearch, bool]:
+    """
+    Fallback research with one free-text query per topic. Returns the research
+    and whether every query succeeded.
+    """
+    model = settings.research_model
+
+    company = prospect.company_name
+    url_hint, industry_hint = _prompt_hints(prospect)
+
+    queries = []
     if depth == ResearchDepth.QUICK:
         queries = [
             (
@@ -129,12 +315,20 @@ async def research_company(prospect: ProspectRow) -> CompanyResearch:
             ),
         ]
 
-    results = []
-    for query in queries:
-        result = await _query_perplexity(query, model=model)
-        results.append(result)
+    # Queries are independent, so run them concurrently. A failed sub-query
+    # becomes an empty section instead of failing the whole row.
+    outcomes = await asyncio.gather(
+        *(_query_perplexity(query, model=model) for query in queries),
+        return_exceptions=True,
+    )
+    failures = [o for o in outcomes if isinstance(o, BaseException)]
+    if len(failures) == len(outcomes):
+        raise failures[0]
+    for failure in failures:
+        print(f"Research sub-query failed for {company}: {type(failure).__name__}: {failure}")
+    results = ["" if isinstance(o, BaseException) else o for o in outcomes]
 
-    raw_research = "\n\n---\n\n".join(results)
+    raw_research = "\n\n---\n\n".join(r for r in results if r)
 
     research = CompanyResearch(
         company_name=company,
@@ -149,42 +343,59 @@ async def research_company(prospect: ProspectRow) -> CompanyResearch:
         raw_research=raw_research,
     )
 
-    # Save to cache for future lookups
-    await _save_research_cache(company, research)
-
-    return research
+    return research, not failures
 
 
 def _extract_bullet_points(text: str) -> list[str]:
     """Extract bullet-point-like items from research text."""
-    points = []
-    for line in text.split("\n"):
-        line = line.strip()
-        if line.startswith(("-", "•", "*", "–")) and len(line) > 5:
-            cleaned = line.lstrip("-•*– ").strip()
-            if cleaned:
-                points.append(cleaned)
+    points = _BULLET_RE.findall("\n" + text)
     if not points:
-        sentences = [s.strip() for s in text.split(".") if len(s.strip()) > 20]
-        points = sentences[:5]
+        sentences = (m.group().strip() for m in _SENTENCE_RE.finditer(text))
+        points = list(islice((s for s in sentences if len(s) > 20), 5))
     return points
 
 
-async def _check_research_cache(company_name: str) -> CompanyResearch | None:
-    """Check Postgres cache for existing research. Returns None if not found or expired."""
+def _get_redis_research(normalized_name: str) -> CompanyResearch | None:
+    """Research from the Redis tier, or None on a miss or Redis error."""
+    try:
+        cached = redis_client.get(f"research:{normalized_name}")
+        return CompanyResearch.model_validate_json(cached) if cached else None
+    except Exception as e:
+        print(f"Redis research lookup failed for {normalized_name}: {type(e).__name__}: {e}")
+        return None
+
+
+def _set_redis_research(normalized_name: str, research: CompanyResearch, ttl_seconds: int):
+    """Store research in the Redis tier; a Redis outage only costs the fast path."""
+    if ttl_seconds <= 0:
+        return
+    try:
+        redis_client.set(f"research:{normalized_name}", research.model_dump_json(), ex=ttl_seconds)
+    except Exception as e:
+        print(f"Redis research write failed for {normalized_name}: {type(e).__name__}: {e}")
+
+
+async def _check_research_cache(normalized_name: str) -> CompanyResearch | None:
+    """
+    Check the research cache, Redis first and then Postgres. Returns None if
+    not found or expired. A Postgres hit warms Redis for its remaining TTL.
+    """
     from app.database import async_session
-    from app.db_models import ResearchCache
+    from app.db_models import ResearchCache, research_cache_key
     from sqlalchemy import select
 
+    cached = _get_redis_research(normalized_name)
+    if cached is not None:
+        return cached
+
     if async_session is None:
         return None
 
-    normalized = company_name.strip().lower()
     try:
         async with async_session() as session:
             result = await session.execute(
                 select(ResearchCache).where(
-                    ResearchCache.company_name_normalized == normalized
+                    ResearchCache.company_name_hash == research_cache_key(normalized_name)
                 )
             )
             entry = result.scalar_one_or_none()
@@ -198,26 +409,36 @@ async def _check_research_cache(company_name: str) -> CompanyResearch | None:
             if age.days > RESEARCH_CACHE_TTL_DAYS:
                 return None
 
-            return CompanyResearch(**entry.research_data)
-    except Exception:
+            research = CompanyResearch(**entry.research_data)
+    except Exception as e:
+        print(f"Postgres research lookup failed for {normalized_name}: {type(e).__name__}: {e}")
         return None
 
+    _set_redis_research(
+        normalized_name, research, RESEARCH_CACHE_TTL_SECONDS - int(age.total_seconds())
+    )
+    return research
 
-async def _save_research_cache(company_name: str, research: CompanyResearch):
-    """Save research results to Postgres cache."""
+
+async def _save_research_cache(normalized_name: str, research: CompanyResearch):
+    """Save research results to the Redis and Postgres caches."""
     from app.database import async_session
-    from app.db_models import ResearchCache
+    from app.db_models import ResearchCache, research_cache_key
+
+    _set_redis_research(normalized_name, research, RESEARCH_CACHE_TTL_SECONDS)
 
     if async_session is None:
         return
 
-    normalized = company_name.strip().lower()
     try:
         async with async_session() as session:
             session.add(ResearchCache(
-                company_name_normalized=normalized,
+                company_name_hash=research_cache_key(normalized_name),
+                company_name_normalized=normalized_name,
                 research_data=research.model_dump(),
             ))
             await session.commit()
-    except Exception:
-        pass  # Duplicate key or DB error — skip silently
+    except IntegrityError:
+        pass  # Another row for the same company saved it first
+    except Exception as e:
+        print(f"Postgres research write failed for {normalized_name}: {type(e).__name__}: {e}")
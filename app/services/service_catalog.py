@@ -3,21 +3,68 @@ Service catalog loader.
 Reads LakeB2B service definitions from YAML and provides matching logic.
 """
 from __future__ import annotations
+import re
 import yaml
+from functools import lru_cache
 from pathlib import Path
 
+import msgspec
+
 from app.models import ServiceDefinition, CompanyResearch
 
+_WORD_RE = re.compile(r"\w+")
 
-_catalog_cache: list[ServiceDefinition] | None = None
 
+def _tokens(text: str) -> frozenset[str]:
+    """Lowercase word tokens of `text`, punctuation dropped."""
+    return frozenset(_WORD_RE.findall(text.lower()))
 
-def load_catalog(yaml_path: str = "./data/services_catalog.yaml") -> list[ServiceDefinition]:
-    """Load service definitions from YAML file. Caches after first load."""
-    global _catalog_cache
-    if _catalog_cache is not None:
-        return _catalog_cache
 
+# (service, description tokens, one token set per pain point, lowercased industries)
+ServiceKeys = tuple[ServiceDefinition, frozenset[str], tuple[frozenset[str], ...], tuple[str, ...]]
+
+
+class CatalogIndex(msgspec.Struct, frozen=True):
+    """
+    Matching inputs precomputed per catalog, so scoring never re-lowercases or
+    re-splits catalog text. Each service's keys are one plain tuple, unpacked
+    positionally, so the scoring loop never goes through pydantic attributes.
+    """
+    services: list[ServiceDefinition]
+    rows: tuple[ServiceKeys, ...]
+
+
+def _service_keys(svc: ServiceDefinition) -> ServiceKeys:
+    return (
+        svc,
+        frozenset(w for w in _tokens(svc.description) if len(w) > 4),  # skip short words
+        tuple(_tokens(pain) for pain in svc.pain_points_addressed),
+        tuple(ind.lower() for ind in svc.ideal_for_industries),
+    )
+
+
+def _build_index(catalog: list[ServiceDefinition]) -> CatalogIndex:
+    return CatalogIndex(services=catalog, rows=tuple(_service_keys(svc) for svc in catalog))
+
+
+# Indexes of catalogs returned by load_catalog, keyed by id() of the list
+_indexes: dict[int, CatalogIndex] = {}
+
+
+def _index_for(catalog: list[ServiceDefinition]) -> CatalogIndex:
+    """The precomputed index of a loaded catalog; other lists are indexed on the fly."""
+    index = _indexes.get(id(catalog))
+    if index is None or index.services is not catalog:
+        index = _build_index(catalog)
+    return index
+
+
+@lru_cache(maxsize=4)
+def load_catalog(yaml_path: str = "./data/services_catalog.yaml") -> list[ServiceDefinition]:
+    """
+    Load service definitions from YAML file. Cached per path for the life of
+    the process, so callers share one list and must not mutate it.
+    """
     path = Path(yaml_path)
     if not path.exists():
         raise FileNotFoundError(
@@ -32,14 +79,14 @@ def load_catalog(yaml_path: str = "./data/services_catalog.yaml") -> list[Servic
     for svc_data in data.get("services", []):
         services.append(ServiceDefinition(**svc_data))
 
-    _catalog_cache = services
+    _indexes[id(services)] = _build_index(services)
     return services
 
 
 def reload_catalog(yaml_path: str = "./data/services_catalog.yaml") -> list[ServiceDefinition]:
     """Force reload the catalog (e.g., after editing YAML)."""
-    global _catalog_cache
-    _catalog_cache = None
+    load_catalog.cache_clear()
+    _indexes.clear()
     return load_catalog(yaml_path)
 
 
@@ -56,42 +103,48 @@ def match_services(
     This is a lightweight heuristic – Claude will do the real nuanced mapping.
     This pre-filters the catalog to give Claude fewer, more relevant services.
     """
+    return [svc for svc, _ in score_services(research, prospect_industry, catalog, top_n)]
+
+
+def score_services(
+    research: CompanyResearch,
+    prospect_industry: str,
+    catalog: list[ServiceDefinition] | None = None,
+    top_n: int = 3,
+) -> list[tuple[ServiceDefinition, float]]:
+    """Top N (service, keyword score) pairs, highest score first."""
     if catalog is None:
         catalog = load_catalog()
 
+    index = _index_for(catalog)
     scored: list[tuple[float, ServiceDefinition]] = []
 
     # Build a bag of words from research
-    research_text = " ".join([
+    research_words = _tokens(" ".join([
         research.overview,
         " ".join(research.pain_points),
         " ".join(research.tech_stack),
         research.industry_context,
         " ".join(research.opportunities),
-    ]).lower()
+    ]))
 
-    for service in catalog:
+    industry = prospect_industry.lower()
+    for service, desc_tokens, pain_token_sets, industries in index.rows:
         score = 0.0
 
         # Industry match bonus
-        for ind in service.ideal_for_industries:
-            if ind.lower() in prospect_industry.lower() or prospect_industry.lower() in ind.lower():
-                score += 3.0
-                break
+        if any(ind in industry or industry in ind for ind in industries):
+            score += 3.0
 
         # Pain point keyword overlap
-        for pain in service.pain_points_addressed:
-            pain_words = set(pain.lower().split())
-            overlap = sum(1 for w in pain_words if w in research_text)
-            score += overlap * 0.5
+        for pain_words in pain_token_sets:
+            score += len(pain_words & research_words) * 0.5
 
         # Description keyword overlap with research text
-        desc_words = set(service.description.lower().split())
-        desc_overlap = sum(1 for w in desc_words if len(w) > 4 and w in research_text)
-        score += desc_overlap * 0.2
+        score += len(desc_tokens & research_words) * 0.2
 
         scored.append((score, service))
 
     # Sort by score descending, return top N
     scored.sort(key=lambda x: x[0], reverse=True)
-    return [svc for _, svc in scored[:top_n]]
+    return [(svc, score) for score, svc in scored[:top_n]]
@@ -1,16 +1,47 @@
 """
 Celery task definitions for the pitch deck pipeline.
-Each Excel row becomes one task processed sequentially.
+Excel batches run rows concurrently on one event loop via run_batch, either
+in-process or as process_prospect_batch chunks; process_prospect and
+process_single_prospect handle one row each.
 """
 import asyncio
-import time
 import traceback
+from contextlib import AbstractAsyncContextManager, nullcontext
 
-from celery import Celery
-import redis
+from celery import Celery, group
+from celery.exceptions import SoftTimeLimitExceeded
+import msgspec
+from sqlalchemy import insert, select
 
 from app.config import settings
+from app.db_models import (
+    GeneratedDeck,
+    ResearchCache,
+    normalize_company_name,
+    research_cache_key,
+)
 from app.models import ProspectRow, RowResult, RowStatus
+from app.redis import redis_client
+from app.services import http_client
+from app.services.content_generator import (
+    CacheUsage,
+    batch_cache_usage,
+    current_row,
+    generate_pitch,
+    log_batch_cache_usage,
+    map_services,
+)
+from app.services.excel_parser import write_results
+from app.services.gamma_client import create_presentation
+from app.services.researcher import research_company
+
+# Time limits for one row: 10 minute hard limit, 9 minute soft limit
+ROW_TIME_LIMIT = 600
+ROW_SOFT_TIME_LIMIT = 540
+
+# A batch chunk of `batch_task_rows` rows runs them in waves bounded by the
+# tighter of the two stage limits, and gets one row's time limit per wave
+_BATCH_WAVES = -(-settings.batch_task_rows // min(settings.max_concurrency, settings.max_gamma_concurrency))
 
 # Initialize Celery with Redis backend
 celery_app = Celery(
@@ -26,26 +57,27 @@ celery_app.conf.update(
     worker_concurrency=1,  # Solo pool; one task at a time (API rate limits)
     task_acks_late=True,
     worker_prefetch_multiplier=1,
-    task_time_limit=600,  # 10 minute hard limit per task
-    task_soft_time_limit=540,  # 9 minute soft limit
+    task_time_limit=ROW_TIME_LIMIT,
+    task_soft_time_limit=ROW_SOFT_TIME_LIMIT,
 )
 
-# Redis client for status tracking
-redis_client = redis.from_url(settings.redis_url, decode_responses=True)
+_STATUS_BYTES = {status: status.value.encode() for status in RowStatus}
 
 
 def _update_row_status(job_id: str, row_index: int, status: RowStatus, **extra):
-    """Update the status of a specific row in Redis."""
-    key = f"job:{job_id}:row:{row_index}"
-    data = {"status": status.value, **extra}
-    redis_client.hset(key, mapping={k: str(v) for k, v in data.items()})
+    """
+    Update the status of a specific row in Redis, in a single round trip.
+    `extra` fields (deck_url, pptx_url, error) are passed as strings.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hset(f"job:{job_id}:row:{row_index}", mapping={"status": _STATUS_BYTES[status], **extra})
 
     # Also update the job-level progress
-    job_key = f"job:{job_id}"
     if status == RowStatus.COMPLETE:
-        redis_client.hincrby(job_key, "completed", 1)
+        pipe.hincrby(f"job:{job_id}", "completed", 1)
     elif status == RowStatus.FAILED:
-        redis_client.hincrby(job_key, "failed", 1)
+        pipe.hincrby(f"job:{job_id}", "failed", 1)
+    pipe.execute()
 
 
 def _run_async(coro):
@@ -55,49 +87,61 @@ def _run_async(coro):
     try:
         return loop.run_until_complete(coro)
     finally:
+        # Rows still in flight (e.g. after a soft time limit) are cancelled,
+        # not left pending on a closed loop
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.run_until_complete(http_client.aclose())
         loop.close()
 
 
-def _persist_to_db(job_id, prospect_data, research, pitch_content, gamma_result):
-    """Persist pipeline results to Postgres. Fails silently if DB not configured."""
-    from app.database import async_session
-    from app.db_models import GeneratedDeck, ResearchCache
-    from sqlalchemy import select
+def _persist_to_db(job_id, prospect_data, normalized_name, research, pitch_content, gamma_result):
+    """
+    Persist pipeline results to Postgres. Fails silently if DB not configured.
+    `normalized_name` is the company name as normalized for the research cache.
+    """
+    from app.database import async_session  # bound by init_db at startup
 
     if async_session is None:
         return
 
     async def _save():
         async with async_session() as session:
-            deck = GeneratedDeck(
-                job_id=job_id,
-                company_name=prospect_data.get("company_name", ""),
-                contact_name=prospect_data.get("contact_name", ""),
-                deck_url=gamma_result.url,
-                pptx_url=gamma_result.pptx_url,
-                pdf_url=gamma_result.pdf_url,
-                gamma_id=gamma_result.gamma_id,
-                research_data=research.model_dump(),
-                pitch_content=pitch_content.model_dump(),
-                mapped_services=[s.model_dump() for s in pitch_content.mapped_services],
-            )
-            session.add(deck)
+            await session.execute(insert(GeneratedDeck), [{
+                "job_id": job_id,
+                "company_name": prospect_data.get("company_name", ""),
+                "contact_name": prospect_data.get("contact_name", ""),
+                "deck_url": gamma_result.url,
+                "pptx_url": gamma_result.pptx_url,
+                "pdf_url": gamma_result.pdf_url,
+                "gamma_id": gamma_result.gamma_id,
+                "research_data": research.model_dump(),
+                "pitch_content": pitch_content.model_dump(),
+                "mapped_services": [s.model_dump() for s in pitch_content.mapped_services],
+            }])
+            await session.commit()
 
-            # Upsert research cache
-            normalized = prospect_data.get("company_name", "").strip().lower()
-            if normalized:
+            # Upsert research cache in its own transaction, so a cache-table
+            # problem cannot roll back the deck history above
+            if not normalized_name:
+                return
+            try:
+                key = research_cache_key(normalized_name)
                 existing = await session.execute(
-                    select(ResearchCache).where(
-                        ResearchCache.company_name_normalized == normalized
-                    )
+                    select(ResearchCache.id).where(ResearchCache.company_name_hash == key)
                 )
                 if not existing.scalar_one_or_none():
                     session.add(ResearchCache(
-                        company_name_normalized=normalized,
+                        company_name_hash=key,
+                        company_name_normalized=normalized_name,
                         research_data=research.model_dump(),
                     ))
-
-            await session.commit()
+                    await session.commit()
+            except Exception:
+                await session.rollback()
+                traceback.print_exc()
 
     try:
         _run_async(_save())
@@ -105,54 +149,237 @@ def _persist_to_db(job_id, prospect_data, research, pitch_content, gamma_result)
         traceback.print_exc()
 
 
-@celery_app.task(bind=True, max_retries=2, default_retry_delay=10)
-def process_prospect(self, prospect_data: dict, job_id: str):
+async def _research_and_map(prospect: ProspectRow, normalized_name: str, long_ttl: bool):
+    """Company-level work for one account: research, then the top-3 service mapping."""
+    research = await research_company(prospect, normalized_name)
+    services = await map_services(prospect, research, long_ttl)
+    return research, services
+
+
+async def _run_stages(
+    prospect: ProspectRow,
+    job_id: str,
+    long_ttl: bool,
+    llm_slots: AbstractAsyncContextManager,
+    gamma_slots: AbstractAsyncContextManager,
+    accounts: dict[str, asyncio.Task],
+) -> RowResult:
     """
-    Main pipeline task: Research → Content Gen → Gamma Deck → Return URL.
-    Runs synchronously within Celery worker.
+    Research → Content Gen → Gamma Deck → persist for one row, recording
+    status as it goes. Errors propagate to the caller.
+    The LLM stages and the Gamma stage hold separate slots, so a row waiting
+    on Gamma frees its LLM slot for the next prospect's research and pitch.
+    Research and service mapping are shared through `accounts`, keyed by
+    normalized company name, by every row for the same company whatever its
+    website; the pitch is still written per contact.
     """
-    from app.services.researcher import research_company
-    from app.services.content_generator import generate_pitch
-    from app.services.gamma_client import create_presentation
-
-    prospect = ProspectRow(**prospect_data)
     row_index = prospect.row_index
+    current_row.set(row_index)
 
-    try:
-        # Step 1: Research
+    async with llm_slots:
         _update_row_status(job_id, row_index, RowStatus.RESEARCHING)
-        research = _run_async(research_company(prospect))
-        time.sleep(2)  # Rate limit buffer between API calls
+        normalized_name = normalize_company_name(prospect.company_name)
+        if normalized_name not in accounts:
+            accounts[normalized_name] = asyncio.ensure_future(
+                _research_and_map(prospect, normalized_name, long_ttl)
+            )
+        research, services = await accounts[normalized_name]
 
-        # Step 2: Content Generation
         _update_row_status(job_id, row_index, RowStatus.GENERATING_CONTENT)
-        pitch_content = _run_async(generate_pitch(prospect, research))
-        time.sleep(2)
+        pitch_content = await generate_pitch(
+            prospect, research, selected_services=services, long_ttl=long_ttl
+        )
 
-        # Step 3: Gamma Deck Creation
+    async with gamma_slots:
         _update_row_status(job_id, row_index, RowStatus.CREATING_DECK)
-        gamma_result = _run_async(create_presentation(pitch_content))
+        gamma_result = await create_presentation(pitch_content)
+
+    # _persist_to_db drives its own event loop, so keep it off this one
+    await asyncio.to_thread(
+        _persist_to_db,
+        job_id,
+        msgspec.to_builtins(prospect),
+        normalized_name,
+        research,
+        pitch_content,
+        gamma_result,
+    )
+
+    _update_row_status(
+        job_id,
+        row_index,
+        RowStatus.COMPLETE,
+        deck_url=gamma_result.url,
+        pptx_url=gamma_result.pptx_url,
+    )
+    return RowResult(
+        row_index=row_index,
+        company_name=prospect.company_name,
+        status=RowStatus.COMPLETE,
+        deck_url=gamma_result.url,
+        pptx_url=gamma_result.pptx_url,
+    )
+
+
+async def _process_row(
+    prospect: ProspectRow,
+    job_id: str,
+    long_ttl: bool,
+    llm_slots: asyncio.Semaphore,
+    gamma_slots: asyncio.Semaphore,
+    accounts: dict[str, asyncio.Task],
+) -> RowResult:
+    """
+    One row of a concurrent batch; a failure is recorded and returned as a
+    FAILED result. A soft time limit is re-raised so it ends the whole chunk.
+    """
+    try:
+        return await _run_stages(prospect, job_id, long_ttl, llm_slots, gamma_slots, accounts)
 
-        # Persist to Postgres
-        _persist_to_db(job_id, prospect_data, research, pitch_content, gamma_result)
+    except SoftTimeLimitExceeded:
+        raise
 
-        # Step 4: Success
-        _update_row_status(
-            job_id,
-            row_index,
-            RowStatus.COMPLETE,
-            deck_url=gamma_result.url,
-            pptx_url=gamma_result.pptx_url,
+    except Exception as exc:
+        error_msg = f"{type(exc).__name__}: {str(exc)}"
+        traceback.print_exc()
+        try:
+            _update_row_status(job_id, prospect.row_index, RowStatus.FAILED, error=error_msg)
+        except Exception:
+            traceback.print_exc()  # Redis down too; the result below still reaches finalize_job
+        return RowResult(
+            row_index=prospect.row_index,
+            company_name=prospect.company_name,
+            status=RowStatus.FAILED,
+            error=error_msg,
         )
 
-        result = RowResult(
+
+async def _pipeline(prospect: ProspectRow, job_id: str, long_ttl: bool = False) -> RowResult:
+    """
+    One Celery-dispatched row. All stages share one event loop, so the HTTP
+    client's connections stay warm from research through to the Gamma poll.
+    There are no other rows to share slots or research with. Errors
+    propagate so the calling task can record the failure and retry.
+    """
+    return await _run_stages(prospect, job_id, long_ttl, nullcontext(), nullcontext(), {})
+
+
+async def _run_batch(prospects: list[ProspectRow], job_id: str, long_ttl: bool) -> list[RowResult]:
+    """
+    Process all rows on one event loop, bounded per stage by `max_concurrency`
+    (research/Claude) and `max_gamma_concurrency` (Gamma). Every row is
+    scheduled up front and awaited together; awaiting each row before
+    scheduling the next would serialize the I/O waits again.
+    """
+    cache_usage = CacheUsage()
+    batch_cache_usage.set(cache_usage)
+
+    llm_slots = asyncio.Semaphore(settings.max_concurrency)
+    gamma_slots = asyncio.Semaphore(settings.max_gamma_concurrency)
+    accounts: dict[str, asyncio.Task] = {}
+    results = await asyncio.gather(*(
+        _process_row(p, job_id, long_ttl, llm_slots, gamma_slots, accounts) for p in prospects
+    ))
+    log_batch_cache_usage(job_id, cache_usage)
+    return results
+
+
+def run_batch(prospects: list[ProspectRow], job_id: str, long_ttl: bool = False) -> list[dict]:
+    """Run a whole Excel batch concurrently from a sync context (background thread)."""
+    results = _run_async(_run_batch(prospects, job_id, long_ttl))
+    return [msgspec.to_builtins(r) for r in results]
+
+
+def _collect_row_results(job_id: str, row_indices: list[int], error: str) -> list[RowResult]:
+    """
+    Results for `row_indices` as recorded in Redis. Rows that never reached
+    COMPLETE or FAILED are marked FAILED with `error` first.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    for row_index in row_indices:
+        pipe.hgetall(f"job:{job_id}:row:{row_index}")
+    rows = pipe.execute()
+
+    results = []
+    for row_index, row in zip(row_indices, rows):
+        fields = {key.decode(): value.decode() for key, value in row.items()}
+        status = fields.get("status", "")
+        if status not in (RowStatus.COMPLETE.value, RowStatus.FAILED.value):
+            _update_row_status(job_id, row_index, RowStatus.FAILED, error=error)
+            status, fields["error"] = RowStatus.FAILED.value, error
+        results.append(RowResult(
             row_index=row_index,
-            company_name=prospect.company_name,
-            status=RowStatus.COMPLETE,
-            deck_url=gamma_result.url,
-            pptx_url=gamma_result.pptx_url,
+            company_name=fields.get("company_name", ""),
+            status=RowStatus(status),
+            deck_url=fields.get("deck_url", ""),
+            pptx_url=fields.get("pptx_url", ""),
+            error=fields.get("error", ""),
+        ))
+    return results
+
+
+@celery_app.task(
+    soft_time_limit=ROW_SOFT_TIME_LIMIT * _BATCH_WAVES,
+    time_limit=ROW_SOFT_TIME_LIMIT * _BATCH_WAVES + (ROW_TIME_LIMIT - ROW_SOFT_TIME_LIMIT),
+)
+def process_prospect_batch(prospect_dicts: list[dict], job_id: str, long_ttl: bool = False):
+    """
+    Process a chunk of rows in one task, concurrently on one event loop.
+    With worker_concurrency=1 a per-row task serializes every API wait on the
+    worker; a chunk overlaps them within the batch semaphores instead. Failed
+    rows come back as FAILED results rather than retrying the whole chunk.
+    If the chunk hits its soft time limit, rows still in flight are marked
+    FAILED and the chunk returns normally, so the chord still finalizes.
+    """
+    prospects = [msgspec.convert(p, ProspectRow) for p in prospect_dicts]
+    try:
+        return run_batch(prospects, job_id, long_ttl)
+    except SoftTimeLimitExceeded:
+        traceback.print_exc()
+        results = _collect_row_results(
+            job_id,
+            [p.row_index for p in prospects],
+            "SoftTimeLimitExceeded: batch chunk ran past its time limit",
         )
-        return result.model_dump()
+        return [msgspec.to_builtins(r) for r in results]
+
+
+def dispatch_batches(
+    prospects: list[ProspectRow], job_id: str, original_file_path: str, long_ttl: bool = False
+):
+    """
+    Queue an Excel batch on the Celery workers as chunks of `batch_task_rows`
+    rows, with finalize_job as the chord callback once every chunk is done.
+    If a chunk fails outright (e.g. its hard time limit), the chord skips the
+    callback and calls finalize_failed_job instead.
+    """
+    rows = [msgspec.to_builtins(p) for p in prospects]
+    size = settings.batch_task_rows
+    chunks = group(
+        process_prospect_batch.s(rows[i:i + size], job_id, long_ttl)
+        for i in range(0, len(rows), size)
+    )
+    # Linked to the callback rather than passed to apply_async, where the
+    # chord would copy it onto every chunk and finalize once per failure
+    callback = finalize_job.s(job_id, original_file_path).on_error(
+        finalize_failed_job.si(job_id, original_file_path, [p.row_index for p in prospects])
+    )
+    return (chunks | callback).apply_async()
+
+
+@celery_app.task(bind=True, max_retries=2, default_retry_delay=10)
+def process_prospect(self, prospect_data: dict, job_id: str, long_ttl: bool = False):
+    """
+    Main pipeline task: Research → Content Gen → Gamma Deck → Return URL.
+    Runs the whole row on one event loop. `long_ttl` is set for large
+    batches so the Claude prompt prefix stays cached for the whole run.
+    """
+    prospect = msgspec.convert(prospect_data, ProspectRow)
+    row_index = prospect.row_index
+
+    try:
+        result = _run_async(_pipeline(prospect, job_id, long_ttl))
+        return msgspec.to_builtins(result)
 
     except Exception as exc:
         error_msg = f"{type(exc).__name__}: {str(exc)}"
@@ -168,23 +395,23 @@ def process_prospect(self, prospect_data: dict, job_id: str):
         if self.request.retries < self.max_retries:
             raise self.retry(exc=exc)
 
-        return RowResult(
+        return msgspec.to_builtins(RowResult(
             row_index=row_index,
             company_name=prospect.company_name,
             status=RowStatus.FAILED,
             error=error_msg,
-        ).model_dump()
+        ))
 
 
 @celery_app.task
 def finalize_job(results: list, job_id: str, original_file_path: str):
     """
     After all row tasks complete, write deck URLs back to Excel.
-    This is the chord callback that runs after all process_prospect tasks finish.
+    This is the chord callback that runs after all process_prospect or
+    process_prospect_batch tasks finish; batch tasks return a list of rows each.
     """
-    from app.services.excel_parser import write_results
-
-    row_results = [RowResult(**r) for r in results if r]
+    rows = (r for result in results for r in (result if isinstance(result, list) else [result]))
+    row_results = [msgspec.convert(r, RowResult) for r in rows if r]
 
     # Write output Excel
     output_path = write_results(original_file_path, row_results, settings.output_dir)
@@ -199,45 +426,30 @@ def finalize_job(results: list, job_id: str, original_file_path: str):
     return {"job_id": job_id, "output_file": output_path}
 
 
+@celery_app.task
+def finalize_failed_job(job_id: str, original_file_path: str, row_indices: list[int]):
+    """
+    Chord errback for dispatch_batches: a chunk failed, so finalize_job never
+    ran. Rows the failed chunk left unfinished are marked FAILED, and the job
+    is finalized from the row results recorded in Redis.
+    """
+    results = _collect_row_results(
+        job_id, row_indices, "Batch chunk failed before this row finished"
+    )
+    return finalize_job([msgspec.to_builtins(r) for r in results], job_id, original_file_path)
+
+
 @celery_app.task(bind=True, max_retries=2, default_retry_delay=10)
 def process_single_prospect(self, prospect_data: dict, job_id: str):
     """
     Process a single prospect: Research → Content Gen → Gamma Deck → Return URL.
     Same pipeline as process_prospect but for single client form.
     """
-    from app.services.researcher import research_company
-    from app.services.content_generator import generate_pitch
-    from app.services.gamma_client import create_presentation
-
-    prospect = ProspectRow(**prospect_data)
     row_index = 0  # Single client always uses row 0
+    prospect = msgspec.convert({**prospect_data, "row_index": row_index}, ProspectRow)
 
     try:
-        # Step 1: Research
-        _update_row_status(job_id, row_index, RowStatus.RESEARCHING)
-        research = _run_async(research_company(prospect))
-        time.sleep(2)
-
-        # Step 2: Content Generation
-        _update_row_status(job_id, row_index, RowStatus.GENERATING_CONTENT)
-        pitch_content = _run_async(generate_pitch(prospect, research))
-        time.sleep(2)
-
-        # Step 3: Gamma Deck Creation
-        _update_row_status(job_id, row_index, RowStatus.CREATING_DECK)
-        gamma_result = _run_async(create_presentation(pitch_content))
-
-        # Persist to Postgres
-        _persist_to_db(job_id, prospect_data, research, pitch_content, gamma_result)
-
-        # Step 4: Success
-        _update_row_status(
-            job_id,
-            row_index,
-            RowStatus.COMPLETE,
-            deck_url=gamma_result.url,
-            pptx_url=gamma_result.pptx_url,
-        )
+        result = _run_async(_pipeline(prospect, job_id))
 
         # Update job status to complete
         job_key = f"job:{job_id}"
@@ -246,13 +458,7 @@ def process_single_prospect(self, prospect_data: dict, job_id: str):
             "completed": "1",
         })
 
-        return RowResult(
-            row_index=row_index,
-            company_name=prospect.company_name,
-            status=RowStatus.COMPLETE,
-            deck_url=gamma_result.url,
-            pptx_url=gamma_result.pptx_url,
-        ).model_dump()
+        return msgspec.to_builtins(result)
 
     except Exception as exc:
         error_msg = f"{type(exc).__name__}: {str(exc)}"
@@ -274,9 +480,9 @@ def process_single_prospect(self, prospect_data: dict, job_id: str):
         if self.request.retries < self.max_retries:
             raise self.retry(exc=exc)
 
-        return RowResult(
+        return msgspec.to_builtins(RowResult(
             row_index=row_index,
             company_name=prospect.company_name,
             status=RowStatus.FAILED,
             error=error_msg,
-        ).model_dump()
+        ))
@@ -0,0 +1,36 @@
+-- Key research_cache by a SHA-1 of the normalized company name
+-- (app.db_models.research_cache_key) instead of the name itself.
+--
+-- create_all never alters an existing table, so databases created before
+-- company_name_hash existed need this once. The API refuses to start until
+-- it has been applied. Run it in one transaction:
+--
+--   psql "$DATABASE_URL" -1 -f migrations/001_research_cache_company_name_hash.sql
+
+CREATE EXTENSION IF NOT EXISTS pgcrypto;  -- digest() for sha1
+
+ALTER TABLE research_cache ADD COLUMN IF NOT EXISTS company_name_hash bytea;
+
+-- Match normalize_company_name: lower-case, whitespace collapsed
+UPDATE research_cache
+   SET company_name_normalized =
+       regexp_replace(lower(btrim(company_name_normalized)), '\s+', ' ', 'g');
+
+UPDATE research_cache
+   SET company_name_hash = digest(company_name_normalized, 'sha1');
+
+-- Names that only differed in case or spacing now collide; keep the newest
+DELETE FROM research_cache a
+ USING research_cache b
+ WHERE a.company_name_hash = b.company_name_hash
+   AND a.id < b.id;
+
+ALTER TABLE research_cache ALTER COLUMN company_name_hash SET NOT NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_research_cache_company_name_hash
+    ON research_cache (company_name_hash);
+
+-- The plain-text name is kept for debugging only and is no longer unique
+DROP INDEX IF EXISTS ix_research_cache_company_name_normalized;
+ALTER TABLE research_cache
+    DROP CONSTRAINT IF EXISTS research_cache_company_name_normalized_key;